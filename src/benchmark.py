@@ -0,0 +1,391 @@
+import io
+import json
+import logging
+import math
+import platform
+import statistics
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, select
+from src.models import db
+from src.models.user import User
+from src.models.patient import Patient
+from src.models.medical_record import MedicalRecord
+from src.models.appointment import Appointment
+from src.models.billing import BillingRecord
+from src.models.billing_item import BillingItem
+from src.models.insurance import InsuranceDetail
+from src.models.hmo_provider import HMOProvider
+from src.models.hmo_contract import HMOContract
+from src.models.claim import Claim
+from src.models.claim_reconciliation import ClaimReconciliation
+from src.models.job import Job
+from src.seed import SEED_PASSWORD
+from src.utils.query_stats import logger as query_stats_logger
+
+# Timed runs per case, after one untimed warm-up run
+BENCHMARK_ITERATIONS = 5
+# A case regresses when its median is this fraction slower than in the baseline...
+REGRESSION_THRESHOLD = 0.2
+# ...and also at least this many milliseconds slower, so jitter on fast cases is ignored
+REGRESSION_MIN_MS = 5.0
+# Items per request in the bulk endpoint cases and lines in the remittance case
+BENCHMARK_BATCH_SIZE = 100
+BENCHMARK_REMITTANCE_LINES = 1000
+# Endpoints that are not part of the API
+SKIPPED_ENDPOINTS = {'static', 'serve'}
+# Extra GET cases, by endpoint, beyond the one with default parameters
+GET_VARIANTS = {
+    'claim.get_claims': ['limit=1000', 'fields=id,claim_number,status'],
+    'reporting.claim_aging_report': ['by_hmo=true'],
+    'reporting.reconciliation_audit_report': ['limit=1000']
+}
+# Tables counted in the results, to record the size of the dataset
+COUNTED_MODELS = [User, Patient, MedicalRecord, Appointment, BillingRecord, BillingItem, InsuranceDetail,
+                  HMOProvider, HMOContract, Claim, ClaimReconciliation]
+
+
+class BenchmarkError(Exception):
+    """
+    Raised when the database has no data to benchmark against
+    """
+
+
+def _samples():
+    """
+    Ids and values used to fill in route parameters, picked from the busiest rows
+    """
+    def first(column):
+        return db.session.query(func.min(column)).scalar()
+
+    samples = {
+        'user_id': first(Appointment.doctor_id),
+        'patient_id': first(MedicalRecord.patient_id),
+        'medical_record_id': first(MedicalRecord.id),
+        'appointment_id': first(Appointment.id),
+        'billing_record_id': first(BillingItem.billing_record_id),
+        'insurance_detail_id': first(InsuranceDetail.id),
+        'contract_id': first(HMOContract.id),
+        'claim_id': first(ClaimReconciliation.claim_id),
+        'reconciliation_id': first(ClaimReconciliation.id),
+        'hmo_id': db.session.execute(
+            select(Claim.hmo_id).group_by(Claim.hmo_id).order_by(func.count().desc()).limit(1)
+        ).scalar()
+    }
+    missing = [name for name, value in samples.items() if value is None]
+    if missing:
+        raise BenchmarkError(f"No data to benchmark against ({', '.join(missing)} missing); run seed-data first")
+
+    appointment_date = db.session.get(Appointment, samples['appointment_id']).appointment_date
+    samples['date'] = appointment_date.strftime('%Y-%m-%d')
+    samples['username'] = db.session.get(User, samples['user_id']).username
+    claim = db.session.get(Claim, samples['claim_id'])
+    samples['claim'] = {'billing_record_id': claim.billing_record_id, 'hmo_id': claim.hmo_id,
+                        'insurance_detail_id': claim.insurance_detail_id}
+    samples['claim_numbers'] = db.session.execute(
+        select(Claim.claim_number).where(Claim.payment_amount.isnot(None)).order_by(Claim.id).limit(BENCHMARK_REMITTANCE_LINES)
+    ).scalars().all()
+    return samples
+
+
+def _url_values(endpoint, arguments, samples, job_id):
+    """
+    Values for the URL parameters of an endpoint
+    """
+    blueprint = endpoint.split('.')[0]
+    values = {}
+    for argument in arguments:
+        if argument == 'record_id':
+            values[argument] = samples['medical_record_id' if blueprint == 'medical_record' else 'billing_record_id']
+        elif argument == 'status':
+            values[argument] = 'denied' if blueprint == 'claim' else 'pending'
+        elif argument == 'job_id':
+            values[argument] = job_id
+        else:
+            key = {'detail_id': 'insurance_detail_id', 'provider_id': 'hmo_id', 'doctor_id': 'user_id'}.get(argument, argument)
+            values[argument] = samples[key]
+    return values
+
+
+def _throwaway(model, **values):
+    """
+    Insert a row for a delete or cancel case to act on, outside the timed request
+    """
+    row = model(**values)
+    db.session.add(row)
+    db.session.commit()
+    return row.id
+
+
+def _write_cases(samples, token):
+    """
+    Request builders for every endpoint that writes, by endpoint. Each takes the run number
+    and returns (url values, request keyword arguments); rows a request needs are created first.
+    """
+    today = date.today()
+    claim = samples['claim']
+
+    def unique(run, prefix):
+        return f'{prefix}-{token}-{run}'
+
+    def billing_payload(run, index=0):
+        return {'patient_id': samples['patient_id'], 'invoice_number': unique(run, f'BENCH-INV{index}'),
+                'invoice_date': today.isoformat(), 'due_date': (today + timedelta(days=30)).isoformat(),
+                'total_amount': 150, 'balance': 150,
+                'billing_items': [{'service_code': '99213', 'service_description': 'Office visit', 'quantity': 2,
+                                   'unit_price': 75, 'total_price': 150}]}
+
+    def claim_payload(run, index=0):
+        return {**claim, 'claim_number': unique(run, f'BENCH-CLM{index}'), 'submission_date': today.isoformat(),
+                'service_date': today.isoformat(), 'total_amount': 150}
+
+    def remittance(run):
+        lines = ['claim_number,approved_amount,paid_amount,payment_date']
+        for number in samples['claim_numbers']:
+            lines.append(f'{number},100.00,100.00,{today.isoformat()}')
+        csv = io.BytesIO('\n'.join(lines).encode('utf-8'))
+        return {'data': {'file': (csv, 'remittance.csv'), 'user_id': str(samples['user_id'])},
+                'content_type': 'multipart/form-data'}
+
+    user = {'username': None, 'email': None, 'password': 'benchmark', 'first_name': 'Bench', 'last_name': 'Mark', 'role': 'nurse'}
+    return {
+        'auth.register': lambda run: ({}, {'json': {**user, 'username': unique(run, 'bench'), 'email': unique(run, 'bench') + '@example.com'}}),
+        'auth.login': lambda run: ({}, {'json': {'username': samples['username'], 'password': SEED_PASSWORD}}),
+        'auth.register_users_bulk': lambda run: ({}, {'json': {'users': [
+            {**user, 'username': unique(run, f'bulk{i}'), 'email': unique(run, f'bulk{i}') + '@example.com'}
+            for i in range(BENCHMARK_BATCH_SIZE // 10)
+        ]}}),
+        'auth.update_user': lambda run: ({'user_id': samples['user_id']}, {'json': {'is_active': True}}),
+        'auth.delete_user': lambda run: ({'user_id': _throwaway(
+            User, username=unique(run, 'gone'), email=unique(run, 'gone') + '@example.com', password_hash='x',
+            first_name='Bench', last_name='Mark', role='nurse')}, {}),
+        'patient.create_patient': lambda run: ({}, {'json': {'first_name': 'Bench', 'last_name': 'Mark',
+                                                             'date_of_birth': '1980-01-01', 'gender': 'female'}}),
+        'patient.update_patient': lambda run: ({'patient_id': samples['patient_id']}, {'json': {'phone': '+2348000000000'}}),
+        'patient.delete_patient': lambda run: ({'patient_id': _throwaway(
+            Patient, first_name='Bench', last_name='Mark', date_of_birth=date(1980, 1, 1), gender='female')}, {}),
+        'medical_record.create_medical_record': lambda run: ({}, {'json': {
+            'patient_id': samples['patient_id'], 'doctor_id': samples['user_id'], 'visit_date': datetime.now().isoformat()}}),
+        'medical_record.update_medical_record': lambda run: ({'record_id': samples['medical_record_id']}, {'json': {'notes': 'Benchmark'}}),
+        'medical_record.delete_medical_record': lambda run: ({'record_id': _throwaway(
+            MedicalRecord, patient_id=samples['patient_id'], doctor_id=samples['user_id'], visit_date=datetime.now())}, {}),
+        'appointment.create_appointment': lambda run: ({}, {'json': {
+            'patient_id': samples['patient_id'], 'doctor_id': samples['user_id'],
+            'appointment_date': datetime.now().isoformat(), 'reason': 'Benchmark'}}),
+        'appointment.update_appointment': lambda run: ({'appointment_id': samples['appointment_id']}, {'json': {'notes': 'Benchmark'}}),
+        'appointment.delete_appointment': lambda run: ({'appointment_id': _throwaway(
+            Appointment, patient_id=samples['patient_id'], doctor_id=samples['user_id'], appointment_date=datetime.now())}, {}),
+        'billing.create_billing_record': lambda run: ({}, {'json': billing_payload(run)}),
+        'billing.create_billing_records_bulk': lambda run: ({}, {'json': {'billing_records': [
+            billing_payload(run, i) for i in range(BENCHMARK_BATCH_SIZE)
+        ]}}),
+        'billing.update_billing_record': lambda run: ({'record_id': samples['billing_record_id']}, {'json': {'notes': 'Benchmark'}}),
+        'billing.delete_billing_record': lambda run: ({'record_id': _throwaway(
+            BillingRecord, patient_id=samples['patient_id'], invoice_number=unique(run, 'BENCH-DEL'), invoice_date=today,
+            due_date=today, total_amount=0, balance=0)}, {}),
+        'insurance.create_insurance_detail': lambda run: ({}, {'json': {
+            'patient_id': samples['patient_id'], 'hmo_id': samples['hmo_id'], 'policy_number': unique(run, 'BENCH-POL'),
+            'coverage_start_date': today.isoformat()}}),
+        'insurance.update_insurance_detail': lambda run: ({'detail_id': samples['insurance_detail_id']}, {'json': {'group_number': 'GRP-100'}}),
+        'insurance.delete_insurance_detail': lambda run: ({'detail_id': _throwaway(
+            InsuranceDetail, patient_id=samples['patient_id'], hmo_id=samples['hmo_id'], policy_number=unique(run, 'BENCH-DEL'),
+            coverage_start_date=today)}, {}),
+        'hmo.create_hmo_provider': lambda run: ({}, {'json': {'name': unique(run, 'Benchmark HMO')}}),
+        'hmo.update_hmo_provider': lambda run: ({'provider_id': samples['hmo_id']}, {'json': {'is_active': True}}),
+        'hmo.delete_hmo_provider': lambda run: ({'provider_id': _throwaway(HMOProvider, name=unique(run, 'Benchmark HMO'))}, {}),
+        'hmo.create_hmo_contract': lambda run: ({}, {'json': {
+            'hmo_id': samples['hmo_id'], 'contract_number': unique(run, 'BENCH-CTR'),
+            'start_date': today.isoformat(), 'end_date': (today + timedelta(days=365)).isoformat()}}),
+        'hmo.update_hmo_contract': lambda run: ({'contract_id': samples['contract_id']}, {'json': {'payment_terms': 'Net 30'}}),
+        'hmo.delete_hmo_contract': lambda run: ({'contract_id': _throwaway(
+            HMOContract, hmo_id=samples['hmo_id'], contract_number=unique(run, 'BENCH-DEL'), start_date=today, end_date=today)}, {}),
+        'claim.create_claim': lambda run: ({}, {'json': claim_payload(run)}),
+        'claim.create_claims_bulk': lambda run: ({}, {'json': {'claims': [
+            claim_payload(run, i) for i in range(BENCHMARK_BATCH_SIZE)
+        ]}}),
+        'claim.update_claim': lambda run: ({'claim_id': samples['claim_id']}, {'json': {'notes': 'Benchmark'}}),
+        'claim.delete_claim': lambda run: ({'claim_id': _throwaway(
+            Claim, claim_number=unique(run, 'BENCH-DEL'), submission_date=today, service_date=today, total_amount=0, **claim)}, {}),
+        'reconciliation.create_reconciliation': lambda run: ({}, {'json': {
+            'claim_id': samples['claim_id'], 'reconciliation_date': today.isoformat(), 'billed_amount': 100,
+            'approved_amount': 100, 'paid_amount': 100, 'variance_amount': 0, 'created_by': samples['user_id']}}),
+        'reconciliation.update_reconciliation': lambda run: ({'reconciliation_id': samples['reconciliation_id']}, {'json': {'notes': 'Benchmark'}}),
+        'reconciliation.auto_reconcile_claims': lambda run: ({}, {'json': {'user_id': samples['user_id']}}),
+        'reconciliation.ingest_remittance_file': lambda run: ({}, remittance(run)),
+        'job.create_job': lambda run: ({}, {'json': {'job_type': 'report', 'params': {'report': 'claim-aging'}}}),
+        'job.cancel': lambda run: ({'job_id': _throwaway(Job, job_type='report', params='{}', status='queued')}, {})
+    }
+
+
+def _finished_job():
+    """
+    The id of a finished report job for the job read endpoints, creating one if needed
+    """
+    job_id = db.session.execute(select(Job.id).where(Job.status == 'succeeded').limit(1)).scalar()
+    if job_id is None:
+        job_id = _throwaway(Job, job_type='report', params='{"report": "claim-aging"}', status='succeeded',
+                            progress=100, result='{}', started_at=datetime.utcnow(), finished_at=datetime.utcnow())
+    return job_id
+
+
+def _wait_for_jobs(timeout=600):
+    """
+    Wait until no job is queued or running, so jobs started by one case do not slow down the next
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not db.session.query(Job.id).filter(Job.status.in_(['queued', 'running'])).first():
+            return
+        db.session.rollback()
+        time.sleep(0.2)
+
+
+def benchmark_cases(app, samples, read_only=False):
+    """
+    One case per route method (plus GET_VARIANTS), as (name, method, endpoint, prepare),
+    where prepare(run) returns the request's path and keyword arguments
+    """
+    urls = app.url_map.bind('localhost')
+    write_cases = _write_cases(samples, uuid.uuid4().hex[:8])
+    job_id = _finished_job()
+
+    def read_case(endpoint, values, query):
+        def prepare(run):
+            return urls.build(endpoint, values) + (f'?{query}' if query else ''), {}
+        return prepare
+
+    def write_case(endpoint, build):
+        def prepare(run):
+            values, kwargs = build(run)
+            return urls.build(endpoint, values), kwargs
+        return prepare
+
+    cases = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint in SKIPPED_ENDPOINTS:
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if method == 'GET':
+                values = _url_values(rule.endpoint, rule.arguments, samples, job_id)
+                for query in [''] + GET_VARIANTS.get(rule.endpoint, []):
+                    name = f'GET {rule.rule}' + (f'?{query}' if query else '')
+                    cases.append((name, method, rule.endpoint, read_case(rule.endpoint, values, query)))
+            elif not read_only:
+                build = write_cases.get(rule.endpoint)
+                prepare = write_case(rule.endpoint, build) if build is not None else None
+                cases.append((f'{method} {rule.rule}', method, rule.endpoint, prepare))
+    return cases
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def run_benchmarks(app, iterations=BENCHMARK_ITERATIONS, only=None, read_only=False, progress=print):
+    """
+    Time every route of the app through its test client against the configured database.
+
+    Each case gets one untimed warm-up request and `iterations` timed ones. The report cache
+    is switched off meanwhile so reports are computed every time. Returns a JSON-serializable
+    document with the environment, the row counts of the dataset and per-case timings in ms and SQL statement counts.
+    """
+    report_cache = app.extensions.pop('report_cache', None)
+    # One log line per request would drown the progress output
+    log_level = query_stats_logger.level
+    query_stats_logger.setLevel(logging.WARNING)
+    client = app.test_client()
+    try:
+        with app.app_context():
+            samples = _samples()
+            cases = benchmark_cases(app, samples, read_only)
+            row_counts = {model.__tablename__: db.session.query(func.count(model.id)).scalar() for model in COUNTED_MODELS}
+            engine = db.engine
+            database = f'{engine.dialect.name} {".".join(str(part) for part in engine.dialect.server_version_info or ())}'.strip()
+
+        results = {}
+        for name, method, endpoint, prepare in cases:
+            if only and not any(pattern in name for pattern in only):
+                continue
+            if prepare is None:
+                results[name] = {'endpoint': endpoint, 'skipped': 'No request defined for this endpoint'}
+                progress(f'{name}: skipped')
+                continue
+
+            timings = []
+            for run in range(iterations + 1):
+                with app.app_context():
+                    path, kwargs = prepare(run)
+                # A request context reuses an app context that is already pushed, so each request
+                # gets its own one here and, like in a server, a session torn down after it
+                start = time.perf_counter()
+                with app.app_context():
+                    response = client.open(path, method=method, **kwargs)
+                    body = response.get_data()
+                elapsed = (time.perf_counter() - start) * 1000
+                if run:
+                    timings.append(elapsed)
+
+            if method != 'GET':
+                with app.app_context():
+                    _wait_for_jobs()
+
+            results[name] = {
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'bytes': len(body),
+                'db_queries': int(response.headers['X-DB-Queries']) if 'X-DB-Queries' in response.headers else None,
+                'min_ms': round(min(timings), 3),
+                'median_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(_percentile(timings, 0.95), 3),
+                'max_ms': round(max(timings), 3),
+                'mean_ms': round(statistics.fmean(timings), 3)
+            }
+            progress(f"{name}: {results[name]['median_ms']} ms, {results[name]['db_queries']} queries (HTTP {response.status_code})")
+    finally:
+        query_stats_logger.setLevel(log_level)
+        if report_cache is not None:
+            app.extensions['report_cache'] = report_cache
+
+    return {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'database': database,
+        'python': platform.python_version(),
+        'iterations': iterations,
+        'row_counts': row_counts,
+        'results': results
+    }
+
+
+def compare_results(current, baseline, threshold=REGRESSION_THRESHOLD, min_ms=REGRESSION_MIN_MS):
+    """
+    Compare the median of every case timed successfully in both runs.
+    Returns (regressions, improvements), each a list of (name, baseline ms, current ms).
+    """
+    regressions = []
+    improvements = []
+    for name, result in current['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or 'median_ms' not in result or 'median_ms' not in previous:
+            continue
+        if result['status'] >= 400 or previous['status'] >= 400:
+            continue
+
+        before, after = previous['median_ms'], result['median_ms']
+        if after > before * (1 + threshold) and after - before >= min_ms:
+            regressions.append((name, before, after))
+        elif before > after * (1 + threshold) and before - after >= min_ms:
+            improvements.append((name, before, after))
+    return regressions, improvements
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump(results, stream, indent=2, sort_keys=True)
+        stream.write('\n')
@@ -0,0 +1,144 @@
+import json
+import os
+import click
+from sqlalchemy import inspect
+from src.models import db
+from src.models.hmo_provider import HMOProvider
+from src.models.user import User
+from src.routes.reconciliation import ingest_remittance, RemittanceError, REMITTANCE_BATCH_SIZE
+from src.utils.rollups import rebuild_rollups
+from src.seed import seed_data
+from src.benchmark import (BenchmarkError, run_benchmarks, compare_results, load_results, save_results,
+                           BENCHMARK_ITERATIONS, REGRESSION_THRESHOLD, REGRESSION_MIN_MS)
+
+
+def register_commands(app):
+    """
+    Register the maintenance commands on the app's `flask` CLI
+    """
+
+    @app.cli.command('init-db')
+    def init_db():
+        """
+        Create every table declared on the models that is missing from the database.
+
+        Existing tables are left as they are; run create-indexes to add new indexes to them.
+        """
+        db.create_all()
+        click.echo('Database tables created')
+
+    @app.cli.command('create-indexes')
+    def create_indexes():
+        """
+        Create any index declared on the models that is missing from the database.
+
+        Existing tables are altered in place; nothing is dropped or recreated.
+        """
+        inspector = inspect(db.engine)
+        existing_tables = set(inspector.get_table_names())
+
+        created = 0
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name in existing_indexes:
+                    continue
+                click.echo(f'Creating {index.name} on {table.name}')
+                index.create(bind=db.engine)
+                created += 1
+
+        click.echo(f'{created} index(es) created')
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups_command():
+        """
+        Recompute the daily claim and billing rollup tables from the raw rows
+        """
+        rebuild_rollups()
+        click.echo('Rollup tables rebuilt')
+
+    @app.cli.command('import-remittance')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--user-id', type=int, required=True, help='User recorded as creating the reconciliations')
+    @click.option('--hmo-id', type=int, help='Only match claims of this HMO')
+    @click.option('--batch-size', type=click.IntRange(min=1), default=REMITTANCE_BATCH_SIZE, help='Lines applied per transaction')
+    def import_remittance(path, user_id, hmo_id, batch_size):
+        """
+        Apply an HMO remittance CSV to its claims and reconcile them.
+
+        The CSV needs claim_number, approved_amount, paid_amount and payment_date columns.
+        Prints the ingestion summary, including unmatched and ambiguous lines, as JSON.
+        """
+        if not User.query.get(user_id):
+            raise click.BadParameter('User not found', param_hint='--user-id')
+        if hmo_id is not None and not HMOProvider.query.get(hmo_id):
+            raise click.BadParameter('HMO provider not found', param_hint='--hmo-id')
+
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            try:
+                summary = ingest_remittance(stream, user_id, hmo_id, batch_size,
+                                            source=os.path.basename(path))
+            except RemittanceError as e:
+                raise click.ClickException(str(e))
+
+        click.echo(json.dumps(summary, indent=2))
+
+    @app.cli.command('seed-data')
+    @click.option('--scale', type=click.FloatRange(min=0, min_open=True), default=1.0, show_default=True,
+                  help='Multiplier on the default volumes (100k patients, 1M billing records and claims)')
+    @click.option('--seed', type=int, default=1, show_default=True, help='Random seed, for reproducible data')
+    def seed_data_command(scale, seed):
+        """
+        Add synthetic patients, visits, bills, claims and reconciliations for load testing.
+
+        Rows are added after any existing data, and the rollup tables are rebuilt at the end.
+        Every generated user's password is "password".
+        """
+        db.create_all()
+        counts = seed_data(scale, seed, progress=click.echo)
+        click.echo(f'{sum(counts.values())} rows created')
+
+    @app.cli.command('benchmark')
+    @click.option('--iterations', type=click.IntRange(min=1), default=BENCHMARK_ITERATIONS, show_default=True,
+                  help='Timed requests per route, after one warm-up request')
+    @click.option('--only', multiple=True, help='Only run cases whose name contains this text (repeatable)')
+    @click.option('--read-only', is_flag=True, help='Only time GET routes, leaving the data unchanged')
+    @click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Write the results as JSON to this file')
+    @click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Compare against results saved with --output')
+    @click.option('--threshold', type=click.FloatRange(min=0), default=REGRESSION_THRESHOLD, show_default=True,
+                  help='Slowdown of the median, as a fraction, that counts as a regression')
+    @click.option('--min-ms', type=click.FloatRange(min=0), default=REGRESSION_MIN_MS, show_default=True,
+                  help='Smallest slowdown in milliseconds that counts as a regression')
+    def benchmark(iterations, only, read_only, output, baseline, threshold, min_ms):
+        """
+        Time every API route against the configured database (seed it with seed-data first).
+
+        Write routes create and change rows, so compare runs made on freshly seeded databases
+        of the same scale, or use --read-only. Exits with status 1 if a route regressed
+        against --baseline.
+        """
+        try:
+            results = run_benchmarks(app, iterations, only, read_only, progress=click.echo)
+        except BenchmarkError as e:
+            raise click.ClickException(str(e))
+
+        failed = [name for name, result in results['results'].items() if result.get('status', 0) >= 400]
+        if failed:
+            click.echo(f"{len(failed)} route(s) returned an error status: {', '.join(failed)}", err=True)
+        if output:
+            save_results(results, output)
+            click.echo(f'Results written to {output}')
+        if not baseline:
+            return
+
+        regressions, improvements = compare_results(results, load_results(baseline), threshold, min_ms)
+        for name, before, after in improvements:
+            click.echo(f'Faster: {name}: {before} ms -> {after} ms')
+        for name, before, after in regressions:
+            click.echo(f'Regression: {name}: {before} ms -> {after} ms', err=True)
+        if regressions:
+            raise SystemExit(1)
+        click.echo('No regressions against the baseline')
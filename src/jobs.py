@@ -0,0 +1,433 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app, make_response, request
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import aliased
+from src.models import db
+from src.models.job import Job, JobResultChunk
+from src.models.user import User
+from src.utils.pagination import MAX_PAGE_SIZE, keyset_predicate
+
+logger = logging.getLogger(__name__)
+
+# Jobs of each type that may run at the same time, across every process sharing the database
+DEFAULT_JOB_CONCURRENCY = {
+    'auto_reconcile': 1,
+    'report': 2
+}
+
+# Seconds between heartbeats of the jobs a process is running (and sweeps for stale ones)
+JOB_HEARTBEAT_SECONDS = 30
+# A running job without a heartbeat for this many seconds lost its worker
+JOB_STALE_SECONDS = 300
+
+# Reports that can run as jobs, mapped to their view; the reconciliation audit, which has
+# no size limit, is written to the job's result chunks page by page instead
+REPORT_JOBS = {
+    'financial-summary': 'reporting.financial_summary_report',
+    'hmo-performance': 'reporting.hmo_performance_report',
+    'claim-aging': 'reporting.claim_aging_report',
+    'denial-analysis': 'reporting.denial_analysis_report',
+    'reconciliation-audit': 'reporting.reconciliation_audit_report'
+}
+# Audit entries read per query and stored per result chunk by a reconciliation-audit job
+AUDIT_JOB_PAGE_SIZE = MAX_PAGE_SIZE
+
+
+class JobError(ValueError):
+    """
+    Raised for an unknown job type or invalid job parameters
+    """
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a running job once cancellation has been requested
+    """
+
+
+class JobContext:
+    """
+    Handed to a running job to report progress and observe cancellation
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.chunks = 0
+
+    def progress(self, done, total):
+        """
+        Record progress and raise JobCancelled if the job has been cancelled
+        """
+        percent = min(100.0, done * 100.0 / total) if total else 0.0
+        db.session.execute(update(Job).where(Job.id == self.job_id).values(progress=percent))
+        db.session.commit()
+        self.check_cancelled()
+
+    def write_result(self, text):
+        """
+        Append a piece of the result's JSON text and commit it; the job's result is
+        then these pieces joined, and whatever the job returns is ignored
+        """
+        db.session.add(JobResultChunk(job_id=self.job_id, seq=self.chunks, data=text))
+        db.session.commit()
+        self.chunks += 1
+
+    def check_cancelled(self):
+        if db.session.query(Job.cancel_requested).filter(Job.id == self.job_id).scalar():
+            raise JobCancelled()
+
+
+def _validate_auto_reconcile(params):
+    if 'user_id' not in params:
+        raise JobError('User ID is required')
+    if not User.query.get(params['user_id']):
+        raise JobError('User not found')
+    if 'chunk_size' in params:
+        try:
+            if int(params['chunk_size']) < 1:
+                raise ValueError()
+        except (TypeError, ValueError):
+            raise JobError('chunk_size must be a positive integer')
+
+
+def _run_auto_reconcile(params, context):
+    from src.routes.reconciliation import auto_reconcile, AUTO_RECONCILE_CHUNK_SIZE, MAX_AUTO_RECONCILE_CHUNK_SIZE
+    
+    chunk_size = min(int(params.get('chunk_size', AUTO_RECONCILE_CHUNK_SIZE)), MAX_AUTO_RECONCILE_CHUNK_SIZE)
+    return auto_reconcile(params['user_id'], chunk_size, progress=context.progress)
+
+
+def _validate_report(params):
+    if params.get('report') not in REPORT_JOBS:
+        raise JobError(f"report must be one of: {', '.join(sorted(REPORT_JOBS))}")
+    if not isinstance(params.get('args', {}), dict):
+        raise JobError('args must be an object of report query parameters')
+    if params['report'] == 'reconciliation-audit':
+        _audit_period(params.get('args', {}))
+
+
+def _run_report(params, context):
+    """
+    Run a report handler in a request context built from the job's arguments
+    """
+    if params['report'] == 'reconciliation-audit':
+        return _write_reconciliation_audit(params.get('args', {}), context)
+    
+    app = current_app._get_current_object()
+    endpoint = REPORT_JOBS[params['report']]
+    path = next(app.url_map.iter_rules(endpoint)).rule
+    
+    with app.test_request_context(path, query_string=params.get('args', {})):
+        response = make_response(app.view_functions[request.endpoint]())
+        body = json.loads(response.get_data())
+    
+    if response.status_code != 200:
+        raise JobError(body.get('error', f'Report failed with status {response.status_code}'))
+    return body
+
+
+def _audit_period(args):
+    from src.routes.reporting import reconciliation_audit_period
+    
+    try:
+        return reconciliation_audit_period(args)
+    except (TypeError, ValueError):
+        raise JobError('Invalid date format. Use YYYY-MM-DD')
+
+
+def _write_reconciliation_audit(args, context):
+    """
+    Write the whole reconciliation audit report, with every entry, to the job's result
+    chunks. The summary is computed once and the entries are read one keyset page at a
+    time, each page stored as its own chunk, so neither memory nor the cost of a page
+    grows with the size of the report.
+    """
+    from src.routes.reporting import AUDIT_SORT_COLUMNS, audit_entry, reconciliation_audit_entries, reconciliation_audit_head
+    
+    start_date, end_date = _audit_period(args)
+    head = reconciliation_audit_head(start_date, end_date)
+    entries = reconciliation_audit_entries(start_date, end_date)
+    # The same JSON as the report, without next_cursor
+    context.write_result(json.dumps(head)[:-1] + ', "audit_entries": [')
+    
+    done = 0
+    last = None
+    while True:
+        page = entries if last is None else entries.filter(keyset_predicate(AUDIT_SORT_COLUMNS, last))
+        rows = page.order_by(*AUDIT_SORT_COLUMNS).limit(AUDIT_JOB_PAGE_SIZE).all()
+        if rows:
+            context.write_result((', ' if done else '') + ', '.join(json.dumps(audit_entry(row)) for row in rows))
+            done += len(rows)
+            last = [rows[-1].reconciliation_date, rows[-1].id]
+        if len(rows) < AUDIT_JOB_PAGE_SIZE:
+            break
+        context.progress(done, head['summary']['total_reconciliations'])
+    
+    context.write_result(']}')
+
+
+# Job type name -> (validate(params), run(params, context))
+JOB_TYPES = {
+    'auto_reconcile': (_validate_auto_reconcile, _run_auto_reconcile),
+    'report': (_validate_report, _run_report)
+}
+
+_executors = {}
+_executors_lock = threading.Lock()
+_executors_pid = None
+# Ids of the jobs running in this process and of those waiting in its pools,
+# and the pid the monitor thread was started in
+_running_jobs = set()
+_pending_jobs = set()
+_monitor_pid = None
+# Serializes this process's claims, also on databases without SELECT ... FOR UPDATE (SQLite)
+_claim_lock = threading.Lock()
+
+
+def _concurrency(app, job_type):
+    return app.config.get('JOB_CONCURRENCY', {}).get(job_type, DEFAULT_JOB_CONCURRENCY.get(job_type, 1))
+
+
+def _executor(app, job_type):
+    """
+    The bounded worker pool of a job type in this process, created on first use
+    """
+    global _executors_pid
+    with _executors_lock:
+        # Pools do not survive a fork; start fresh in each worker process
+        if _executors_pid != os.getpid():
+            _executors.clear()
+            _running_jobs.clear()
+            _pending_jobs.clear()
+            _executors_pid = os.getpid()
+        
+        executor = _executors.get(job_type)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=_concurrency(app, job_type), thread_name_prefix=f'job-{job_type}')
+            _executors[job_type] = executor
+        return executor
+
+
+def fail_stale_jobs():
+    """
+    Finish running jobs whose worker stopped: they have had no heartbeat for JOB_STALE_SECONDS.
+    They become failed, or cancelled if cancellation had been requested. Returns how many.
+    """
+    now = datetime.utcnow()
+    stale = [Job.status == 'running', Job.updated_at < now - timedelta(seconds=JOB_STALE_SECONDS)]
+    cancelled = db.session.execute(
+        update(Job).where(*stale, Job.cancel_requested.is_(True)).values(status='cancelled', finished_at=now)
+    ).rowcount
+    failed = db.session.execute(
+        update(Job).where(*stale).values(status='failed', error='The worker running this job stopped', finished_at=now)
+    ).rowcount
+    if cancelled or failed:
+        # Partial results of these and of any earlier job that did not succeed
+        db.session.execute(delete(JobResultChunk).where(JobResultChunk.job_id.in_(
+            select(Job.id).where(Job.status.in_(['failed', 'cancelled']))
+        )))
+    db.session.commit()
+    if cancelled or failed:
+        logger.warning('Finished %s stale running job(s)', cancelled + failed)
+    return cancelled + failed
+
+
+def _monitor(app):
+    """
+    Refresh updated_at of the jobs running in this process, so other processes can tell
+    them from jobs whose worker stopped, and finish those
+    """
+    while True:
+        time.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            with app.app_context():
+                with _executors_lock:
+                    job_ids = list(_running_jobs)
+                if job_ids:
+                    db.session.execute(
+                        update(Job).where(Job.id.in_(job_ids), Job.status == 'running').values(updated_at=datetime.utcnow())
+                    )
+                    db.session.commit()
+                fail_stale_jobs()
+                # Offer again the jobs that were queued while their type was at its limit
+                _submit_queued(app)
+        except Exception:
+            logger.exception('Job monitor failed')
+
+
+def _start_monitor(app):
+    """
+    Start this process's monitor thread, once per process
+    """
+    global _monitor_pid
+    with _executors_lock:
+        if _monitor_pid == os.getpid():
+            return
+        _monitor_pid = os.getpid()
+    threading.Thread(target=_monitor, args=(app,), name='job-monitor', daemon=True).start()
+
+
+def _finish(job_id, **values):
+    # A job that did not succeed keeps no partial result
+    if values['status'] != 'succeeded':
+        db.session.execute(delete(JobResultChunk).where(JobResultChunk.job_id == job_id))
+    db.session.execute(update(Job).where(Job.id == job_id).values(finished_at=datetime.utcnow(), **values))
+    db.session.commit()
+
+
+def _claim(app, job_id, job_type):
+    """
+    Mark a queued job running, unless JOB_CONCURRENCY jobs of its type already run in any process.
+
+    The queued and running jobs of the type are read with SELECT ... FOR UPDATE, so concurrent
+    claims from other processes wait for this transaction and then count this claim. Databases
+    without row locks (SQLite) repeat the count in the UPDATE, which they run atomically.
+    """
+    limit = _concurrency(app, job_type)
+    with _claim_lock:
+        try:
+            active = db.session.execute(
+                select(Job.status).where(Job.job_type == job_type, Job.status.in_(['queued', 'running']))
+                .order_by(Job.id).with_for_update()
+            ).scalars().all()
+            if active.count('running') >= limit:
+                db.session.rollback()
+                return False
+            
+            claim = [Job.id == job_id, Job.status == 'queued']
+            # MySQL cannot select from the table an UPDATE changes; its FOR UPDATE above suffices
+            if db.session.get_bind().dialect.name != 'mysql':
+                running = aliased(Job)
+                claim.append(select(func.count(running.id)).where(
+                    running.job_type == job_type, running.status == 'running'
+                ).scalar_subquery() < limit)
+            claimed = db.session.execute(
+                update(Job).where(*claim).values(status='running', started_at=datetime.utcnow())
+            ).rowcount
+            db.session.commit()
+            return bool(claimed)
+        except Exception:
+            # The job stays queued and is offered again by the monitor
+            db.session.rollback()
+            logger.exception('Claiming job %s (%s) failed', job_id, job_type)
+            return False
+
+
+def _run_job(app, job_id, job_type):
+    with app.app_context():
+        with _executors_lock:
+            _pending_jobs.discard(job_id)
+        
+        # Another process may have picked the job up, it may have been cancelled, or its type may be at its limit
+        if not _claim(app, job_id, job_type):
+            return
+        
+        with _executors_lock:
+            _running_jobs.add(job_id)
+        try:
+            job = db.session.get(Job, job_id)
+            params = json.loads(job.params) if job.params else {}
+            run = JOB_TYPES[job.job_type][1]
+            
+            context = JobContext(job_id)
+            try:
+                result = run(params, context)
+            except JobCancelled:
+                db.session.rollback()
+                _finish(job_id, status='cancelled')
+            except Exception as error:
+                db.session.rollback()
+                logger.exception('Job %s (%s) failed', job_id, job.job_type)
+                _finish(job_id, status='failed', error=str(error))
+            else:
+                # A result written in chunks leaves the result column empty
+                _finish(job_id, status='succeeded', progress=100, result=None if context.chunks else json.dumps(result))
+        finally:
+            with _executors_lock:
+                _running_jobs.discard(job_id)
+        
+        # A slot of this type is free now; hand it the jobs waiting for one
+        _submit_queued(app, job_type)
+
+
+def _submit(app, job_id, job_type):
+    """
+    Hand a queued job to its type's worker pool in this process, unless it already waits there
+    """
+    _start_monitor(app)
+    with _executors_lock:
+        if job_id in _pending_jobs or job_id in _running_jobs:
+            return
+        _pending_jobs.add(job_id)
+    _executor(app, job_type).submit(_run_job, app, job_id, job_type)
+
+
+def _submit_queued(app, job_type=None):
+    """
+    Hand every queued job (of job_type, if given) to this process's worker pools, oldest first
+    """
+    query = db.session.query(Job.id, Job.job_type).filter(Job.status == 'queued')
+    if job_type is not None:
+        query = query.filter(Job.job_type == job_type)
+    for job_id, queued_type in query.order_by(Job.id).all():
+        _submit(app, job_id, queued_type)
+
+
+def submit_job(job):
+    """
+    Hand a queued job to its type's worker pool
+    """
+    _submit(current_app._get_current_object(), job.id, job.job_type)
+
+
+def enqueue_job(job_type, params):
+    """
+    Validate, persist and schedule a job; raises JobError for invalid input
+    """
+    if job_type not in JOB_TYPES:
+        raise JobError(f"job_type must be one of: {', '.join(sorted(JOB_TYPES))}")
+    if not isinstance(params, dict):
+        raise JobError('params must be an object')
+    
+    validate = JOB_TYPES[job_type][0]
+    validate(params)
+    
+    job = Job(job_type=job_type, params=json.dumps(params), status='queued')
+    db.session.add(job)
+    db.session.commit()
+    
+    submit_job(job)
+    return job
+
+
+def cancel_job(job):
+    """
+    Cancel a queued job outright, or ask a running job to stop at its next progress check
+    """
+    cancelled = db.session.execute(
+        update(Job).where(Job.id == job.id, Job.status == 'queued').values(status='cancelled', finished_at=datetime.utcnow())
+    ).rowcount
+    if not cancelled:
+        db.session.execute(
+            update(Job).where(Job.id == job.id, Job.status == 'running').values(cancel_requested=True)
+        )
+    db.session.commit()
+    db.session.refresh(job)
+    return job
+
+
+def resume_queued_jobs(app):
+    """
+    Schedule jobs left queued by a previous run of the application, finish the ones
+    left running by a worker that stopped, and start this process's job monitor
+    """
+    _start_monitor(app)
+    with app.app_context():
+        fail_stale_jobs()
+        _submit_queued(app)
@@ -6,21 +6,74 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask
 from src.models.user import db
 from src.routes import register_routes
+from src.commands import register_commands
+from src.utils.report_cache import init_report_cache
+from src.jobs import resume_queued_jobs
+from src.utils.db_pool import engine_options
+from src.utils.query_stats import init_query_stats
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
-# Enable database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{os.getenv('DB_USERNAME', 'root')}:{os.getenv('DB_PASSWORD', 'password')}@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '3306')}/{os.getenv('DB_NAME', 'mydb')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+def create_app(config=None):
+    """
+    Build and configure the application. Settings come from the environment and are
+    overridden by the `config` mapping. Nothing touches the database here: create the
+    schema with `flask --app src.main init-db` and resume queued jobs with
+    resume_queued_jobs once the serving process is up.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
-# Register all routes
-register_routes(app)
+    # Enable database
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or f"mysql+pymysql://{os.getenv('DB_USERNAME', 'root')}:{os.getenv('DB_PASSWORD', 'password')}@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '3306')}/{os.getenv('DB_NAME', 'mydb')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Report result cache: 'memory' (per worker), 'sqlite' (shared by all workers on the host) or '' to disable
+    app.config['REPORT_CACHE_BACKEND'] = os.getenv('REPORT_CACHE_BACKEND', 'sqlite')
+    app.config['REPORT_CACHE_PATH'] = os.getenv('REPORT_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'report_cache.sqlite3'))
+    app.config['REPORT_CACHE_MAX_ENTRIES'] = int(os.getenv('REPORT_CACHE_MAX_ENTRIES', '256'))
+
+    # Background jobs that may run at once per type, across all worker processes (each keeps that many threads)
+    app.config['JOB_CONCURRENCY'] = {
+        'auto_reconcile': int(os.getenv('JOB_CONCURRENCY_AUTO_RECONCILE', '1')),
+        'report': int(os.getenv('JOB_CONCURRENCY_REPORT', '2'))
+    }
+
+    # Request threads per worker process (serve.py --threads), which the pool is sized for
+    app.config['WEB_THREADS'] = int(os.getenv('WEB_THREADS', '4'))
+
+    # Connection pool per process; unset values are derived from the thread counts (see utils/db_pool.py)
+    for key in ('DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_TIMEOUT', 'DB_POOL_RECYCLE', 'DB_POOL_PRE_PING'):
+        app.config[key] = os.getenv(key)
+
+    # Per-request SQL statistics: X-DB-Queries / X-DB-Time-Ms headers and a JSON log line per request
+    app.config['QUERY_STATS'] = os.getenv('QUERY_STATS', 'true').lower() not in ('0', 'false', 'no', 'off')
+    # Query guard (N+1 detector): on in debug and testing mode unless QUERY_REPEAT_LIMIT is set, 'warn' or 'raise'
+    app.config['QUERY_REPEAT_LIMIT'] = os.getenv('QUERY_REPEAT_LIMIT')
+    app.config['QUERY_GUARD_ACTION'] = os.getenv('QUERY_GUARD_ACTION')
+
+    if config:
+        app.config.from_mapping(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+
+    db.init_app(app)
+    init_report_cache(app)
+    init_query_stats(app)
+
+    # Register all routes
+    register_routes(app)
+
+    # Register CLI commands (flask --app src.main init-db)
+    register_commands(app)
+
+    return app
 
-# Create database tables
-with app.app_context():
-    db.create_all()
 
 if __name__ == '__main__':
+    # Development server; use serve.py in production
+    app = create_app()
+
+    # Pick up jobs left queued by a previous run (only in the reloader's serving child)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        resume_queued_jobs(app)
+
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -3,6 +3,11 @@ from src.models import db
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('ix_appointments_appointment_date', 'appointment_date'),
+        db.Index('ix_appointments_patient_id_appointment_date', 'patient_id', 'appointment_date'),
+        db.Index('ix_appointments_doctor_id_appointment_date', 'doctor_id', 'appointment_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
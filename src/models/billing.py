@@ -3,6 +3,10 @@ from src.models import db
 
 class BillingRecord(db.Model):
     __tablename__ = 'billing_records'
+    __table_args__ = (
+        db.Index('ix_billing_records_invoice_date', 'invoice_date'),
+        db.Index('ix_billing_records_patient_id_invoice_date', 'patient_id', 'invoice_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
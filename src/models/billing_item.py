@@ -3,6 +3,9 @@ from src.models import db
 
 class BillingItem(db.Model):
     __tablename__ = 'billing_items'
+    __table_args__ = (
+        db.Index('ix_billing_items_billing_record_id', 'billing_record_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     billing_record_id = db.Column(db.Integer, db.ForeignKey('billing_records.id'), nullable=False)
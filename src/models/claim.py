@@ -3,6 +3,12 @@ from src.models import db
 
 class Claim(db.Model):
     __tablename__ = 'claims'
+    __table_args__ = (
+        db.Index('ix_claims_submission_date_status_hmo_id', 'submission_date', 'status', 'hmo_id'),
+        db.Index('ix_claims_status_submission_date', 'status', 'submission_date'),
+        db.Index('ix_claims_hmo_id_submission_date', 'hmo_id', 'submission_date'),
+        db.Index('ix_claims_billing_record_id', 'billing_record_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     billing_record_id = db.Column(db.Integer, db.ForeignKey('billing_records.id'), nullable=False)
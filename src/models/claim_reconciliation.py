@@ -3,6 +3,11 @@ from src.models import db
 
 class ClaimReconciliation(db.Model):
     __tablename__ = 'claim_reconciliations'
+    __table_args__ = (
+        db.Index('ix_claim_reconciliations_reconciliation_date', 'reconciliation_date'),
+        db.Index('ix_claim_reconciliations_resolution_status_reconciliation_date', 'resolution_status', 'reconciliation_date'),
+        db.Index('ix_claim_reconciliations_claim_id_reconciliation_date', 'claim_id', 'reconciliation_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     claim_id = db.Column(db.Integer, db.ForeignKey('claims.id'), nullable=False)
@@ -15,6 +20,8 @@ class ClaimReconciliation(db.Model):
     action_taken = db.Column(db.String(64))  # accepted, disputed, adjusted
     resolution_status = db.Column(db.String(64), default='pending')  # pending, resolved, escalated
     notes = db.Column(db.Text)
+    # Remittance file the reconciliation was imported from; only set by remittance ingestion
+    remittance_source = db.Column(db.String(255))
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -35,6 +42,7 @@ class ClaimReconciliation(db.Model):
             'action_taken': self.action_taken,
             'resolution_status': self.resolution_status,
             'notes': self.notes,
+            'remittance_source': self.remittance_source,
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
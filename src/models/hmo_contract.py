@@ -3,6 +3,10 @@ from src.models import db
 
 class HMOContract(db.Model):
     __tablename__ = 'hmo_contracts'
+    __table_args__ = (
+        db.Index('ix_hmo_contracts_start_date', 'start_date'),
+        db.Index('ix_hmo_contracts_hmo_id_start_date', 'hmo_id', 'start_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     hmo_id = db.Column(db.Integer, db.ForeignKey('hmo_providers.id'), nullable=False)
@@ -3,6 +3,9 @@ from src.models import db
 
 class HMOProvider(db.Model):
     __tablename__ = 'hmo_providers'
+    __table_args__ = (
+        db.Index('ix_hmo_providers_name', 'name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128), nullable=False)
@@ -3,6 +3,11 @@ from src.models import db
 
 class InsuranceDetail(db.Model):
     __tablename__ = 'insurance_details'
+    __table_args__ = (
+        db.Index('ix_insurance_details_coverage_start_date', 'coverage_start_date'),
+        db.Index('ix_insurance_details_patient_id_coverage_start_date', 'patient_id', 'coverage_start_date'),
+        db.Index('ix_insurance_details_hmo_id_coverage_start_date', 'hmo_id', 'coverage_start_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
@@ -0,0 +1,49 @@
+import json
+from datetime import datetime
+from sqlalchemy.dialects import mysql
+from src.models import db
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_created_at', 'status', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(64), nullable=False)  # auto_reconcile, report
+    params = db.Column(db.Text)  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed, cancelled
+    progress = db.Column(db.Float, nullable=False, default=0)  # percent complete
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    result = db.Column(db.Text().with_variant(mysql.LONGTEXT(), 'mysql'))  # JSON
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'params': json.loads(self.params) if self.params else {},
+            'status': self.status,
+            'progress': self.progress,
+            'cancel_requested': self.cancel_requested,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class JobResultChunk(db.Model):
+    """
+    A piece of the JSON text of a job result too large to build in memory;
+    the job's chunks joined in seq order make up its result
+    """
+    __tablename__ = 'job_result_chunks'
+    
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    data = db.Column(db.Text().with_variant(mysql.LONGTEXT(), 'mysql'), nullable=False)
@@ -3,6 +3,10 @@ from src.models import db
 
 class MedicalRecord(db.Model):
     __tablename__ = 'medical_records'
+    __table_args__ = (
+        db.Index('ix_medical_records_visit_date', 'visit_date'),
+        db.Index('ix_medical_records_patient_id_visit_date', 'patient_id', 'visit_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
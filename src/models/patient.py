@@ -3,6 +3,9 @@ from src.models import db
 
 class Patient(db.Model):
     __tablename__ = 'patients'
+    __table_args__ = (
+        db.Index('ix_patients_last_name', 'last_name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(64), nullable=False)
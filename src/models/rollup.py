@@ -0,0 +1,51 @@
+from datetime import datetime
+from src.models import db
+
+class ClaimDailyRollup(db.Model):
+    __tablename__ = 'claim_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'hmo_id', 'status', name='uq_claim_daily_rollups_day_hmo_id_status'),
+        db.Index('ix_claim_daily_rollups_hmo_id_day', 'hmo_id', 'day'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)  # claims.submission_date
+    hmo_id = db.Column(db.Integer, db.ForeignKey('hmo_providers.id'), nullable=False)
+    status = db.Column(db.String(20))
+    claim_count = db.Column(db.Integer, nullable=False, default=0)
+    billed_amount = db.Column(db.Numeric(16, 2), nullable=False, default=0)  # sum of claims.total_amount
+    approved_amount = db.Column(db.Numeric(16, 2), nullable=False, default=0)
+    paid_amount = db.Column(db.Numeric(16, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ClaimProcessingDailyRollup(db.Model):
+    """
+    Histogram of paid claims by days from submission to payment, per submission day and HMO
+    """
+    __tablename__ = 'claim_processing_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'hmo_id', 'processing_days', name='uq_claim_processing_daily_rollups_key'),
+        db.Index('ix_claim_processing_daily_rollups_hmo_id_day', 'hmo_id', 'day'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)  # claims.submission_date
+    hmo_id = db.Column(db.Integer, db.ForeignKey('hmo_providers.id'), nullable=False)
+    processing_days = db.Column(db.Integer, nullable=False)
+    claim_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class BillingDailyRollup(db.Model):
+    __tablename__ = 'billing_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'status', name='uq_billing_daily_rollups_day_status'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)  # billing_records.invoice_date
+    status = db.Column(db.String(20))
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Numeric(16, 2), nullable=False, default=0)
+    paid_amount = db.Column(db.Numeric(16, 2), nullable=False, default=0)
+    balance = db.Column(db.Numeric(16, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
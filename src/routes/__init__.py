@@ -11,6 +11,10 @@ from src.routes.hmo import hmo_bp
 from src.routes.claim import claim_bp
 from src.routes.reconciliation import reconciliation_bp
 from src.routes.reporting import reporting_bp
+from src.routes.job import job_bp
+from src.utils.pagination import PaginationError
+from src.utils.serialize import FieldsError
+from src.utils.db_pool import pool_stats
 import os
 
 def register_routes(app):
@@ -25,6 +29,17 @@ def register_routes(app):
     app.register_blueprint(claim_bp, url_prefix='/api/claims')
     app.register_blueprint(reconciliation_bp, url_prefix='/api/reconciliation')
     app.register_blueprint(reporting_bp, url_prefix='/api/reports')
+    app.register_blueprint(job_bp, url_prefix='/api')
+    
+    # Malformed ?limit= / ?after= on any list endpoint
+    @app.errorhandler(PaginationError)
+    def handle_pagination_error(error):
+        return jsonify({'error': str(error)}), 400
+    
+    # Unknown names in ?fields= on any entity or list endpoint
+    @app.errorhandler(FieldsError)
+    def handle_fields_error(error):
+        return jsonify({'error': str(error)}), 400
     
     # Create a main blueprint for general routes
     main_bp = Blueprint('main', __name__)
@@ -44,7 +59,8 @@ def register_routes(app):
                 'HMO Management',
                 'Claims Processing',
                 'Reconciliation',
-                'Reporting'
+                'Reporting',
+                'Background Jobs'
             ]
         })
     
@@ -52,6 +68,13 @@ def register_routes(app):
     def health_check():
         return jsonify({'status': 'healthy'})
     
+    @main_bp.route('/health/pool')
+    def pool_health():
+        """
+        Connection pool usage of the worker process that served the request
+        """
+        return jsonify({'status': 'healthy', 'pool': pool_stats(db.engine)})
+    
     app.register_blueprint(main_bp, url_prefix='/api')
     
     # Serve static files
@@ -2,19 +2,21 @@ from flask import Blueprint, request, jsonify, render_template
 from src.models.appointment import Appointment, db
 from src.models.patient import Patient
 from src.models.user import User
-from datetime import datetime
+from src.utils.serialize import serialized_query, paginated_response, entity_response
+from datetime import datetime, timedelta
 
 appointment_bp = Blueprint('appointment', __name__)
 
 @appointment_bp.route('/appointments', methods=['GET'])
 def get_appointments():
-    appointments = Appointment.query.all()
-    return jsonify({'appointments': [appointment.to_dict() for appointment in appointments]}), 200
+    return paginated_response(
+        'appointments', Appointment, serialized_query(Appointment),
+        Appointment.appointment_date, Appointment.id
+    )
 
 @appointment_bp.route('/appointments/<int:appointment_id>', methods=['GET'])
 def get_appointment(appointment_id):
-    appointment = Appointment.query.get_or_404(appointment_id)
-    return jsonify({'appointment': appointment.to_dict()}), 200
+    return entity_response('appointment', Appointment, appointment_id)
 
 @appointment_bp.route('/appointments', methods=['POST'])
 def create_appointment():
@@ -80,9 +82,10 @@ def get_patient_appointments(patient_id):
     patient = Patient.query.get_or_404(patient_id)
     
     # Get all appointments for the patient
-    appointments = Appointment.query.filter_by(patient_id=patient_id).all()
-    
-    return jsonify({'appointments': [appointment.to_dict() for appointment in appointments]}), 200
+    return paginated_response(
+        'appointments', Appointment, serialized_query(Appointment).filter_by(patient_id=patient_id),
+        Appointment.appointment_date, Appointment.id
+    )
 
 @appointment_bp.route('/appointments/by-doctor/<int:doctor_id>', methods=['GET'])
 def get_doctor_appointments(doctor_id):
@@ -90,21 +93,23 @@ def get_doctor_appointments(doctor_id):
     doctor = User.query.get_or_404(doctor_id)
     
     # Get all appointments for the doctor
-    appointments = Appointment.query.filter_by(doctor_id=doctor_id).all()
-    
-    return jsonify({'appointments': [appointment.to_dict() for appointment in appointments]}), 200
+    return paginated_response(
+        'appointments', Appointment, serialized_query(Appointment).filter_by(doctor_id=doctor_id),
+        Appointment.appointment_date, Appointment.id
+    )
 
 @appointment_bp.route('/appointments/by-date/<date>', methods=['GET'])
 def get_appointments_by_date(date):
     try:
         # Parse date string to date object
-        appointment_date = datetime.strptime(date, '%Y-%m-%d').date()
-        
-        # Get all appointments for the date
-        appointments = Appointment.query.filter(
-            db.func.date(Appointment.appointment_date) == appointment_date
-        ).all()
-        
-        return jsonify({'appointments': [appointment.to_dict() for appointment in appointments]}), 200
+        day_start = datetime.strptime(date, '%Y-%m-%d')
     except ValueError:
         return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    day_end = day_start + timedelta(days=1)
+    
+    # Get all appointments for the date, as a half-open range so the appointment_date index is usable
+    query = serialized_query(Appointment).filter(
+        Appointment.appointment_date >= day_start,
+        Appointment.appointment_date < day_end
+    )
+    return paginated_response('appointments', Appointment, query, Appointment.appointment_date, Appointment.id)
@@ -1,9 +1,17 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import User, db
 from werkzeug.security import generate_password_hash, check_password_hash
+from src.utils.bulk import BulkItemError, get_bulk_request, process_bulk, require_fields, parse_string
+from src.utils.serialize import serialized_query, paginated_response, entity_response
+from src.utils.passwords import hash_passwords
+from sqlalchemy import insert, or_, select
 
 auth_bp = Blueprint('auth', __name__)
 
+USER_REQUIRED_FIELDS = ['username', 'email', 'password', 'first_name', 'last_name', 'role']
+# Roles a bulk-created user may have
+USER_ROLES = ['admin', 'doctor', 'nurse', 'receptionist', 'billing']
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -63,13 +71,81 @@ def login():
 
 @auth_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify({'users': [user.to_dict() for user in users]}), 200
+    return paginated_response('users', User, serialized_query(User), User.username, User.id)
 
 @auth_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
-    return jsonify({'user': user.to_dict()}), 200
+    return entity_response('user', User, user_id)
+
+def _parse_bulk_user(item):
+    """
+    Convert one bulk user item into an insert row; the password is hashed after validation
+    """
+    require_fields(item, USER_REQUIRED_FIELDS)
+    row = {field: parse_string(item, field, getattr(User, field)) for field in USER_REQUIRED_FIELDS if field != 'password'}
+    row['password'] = str(item['password'])
+    if not row['password']:
+        raise BulkItemError('password must not be empty')
+    if row['role'] not in USER_ROLES:
+        raise BulkItemError(f"role must be one of: {', '.join(USER_ROLES)}")
+    return row
+
+def _validate_user_chunk(rows, results):
+    """
+    Check the usernames and emails of a chunk of parsed rows against existing users with one query
+    """
+    usernames = [row['username'] for row in rows.values()]
+    emails = [row['email'] for row in rows.values()]
+    taken = db.session.execute(
+        select(User.username, User.email).where(or_(User.username.in_(usernames), User.email.in_(emails)))
+    ).all()
+    taken_usernames = {username for username, _ in taken}
+    taken_emails = {email for _, email in taken}
+    
+    for index, row in list(rows.items()):
+        if row['username'] in taken_usernames:
+            error = 'Username already exists'
+        elif row['email'] in taken_emails:
+            error = 'Email already exists'
+        else:
+            continue
+        results[index] = {'index': index, 'status': 'error', 'error': error}
+        del rows[index]
+
+def _insert_user_chunk(rows, results):
+    """
+    Hash the passwords of a chunk of validated rows in parallel, then bulk insert the users
+    """
+    if not rows:
+        return
+    password_hashes = hash_passwords([row['password'] for row in rows.values()])
+    db.session.execute(insert(User), [
+        {**{key: value for key, value in row.items() if key != 'password'}, 'password_hash': password_hash}
+        for row, password_hash in zip(rows.values(), password_hashes)
+    ])
+    
+    # Usernames are unique, so they map the inserted rows back to their ids
+    ids = dict(db.session.execute(
+        select(User.username, User.id).where(User.username.in_([row['username'] for row in rows.values()]))
+    ).all())
+    for index, row in rows.items():
+        results[index] = {'index': index, 'status': 'created', 'id': ids[row['username']], 'username': row['username']}
+
+@auth_bp.route('/users/bulk', methods=['POST'])
+def register_users_bulk():
+    """
+    Create many user accounts in one request. Usernames and emails are checked with one
+    query per chunk, passwords are hashed in a process pool across CPU cores, and each
+    chunk is inserted with one bulk INSERT. With atomic set, nothing is created unless
+    every user is valid.
+    """
+    try:
+        items, atomic, chunk_size = get_bulk_request('users')
+    except BulkItemError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return process_bulk(items, atomic, chunk_size, _parse_bulk_user, _validate_user_chunk,
+                        _insert_user_chunk, ['username', 'email'], 'users')
 
 @auth_bp.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
@@ -2,18 +2,33 @@ from flask import Blueprint, request, jsonify
 from src.models.billing import BillingRecord, db
 from src.models.billing_item import BillingItem
 from src.models.patient import Patient
+from src.models.medical_record import MedicalRecord
+from src.utils.bulk import (BulkItemError, get_bulk_request, process_bulk, require_fields, parse_date,
+                            check_amount, parse_amount, parse_string, parse_int, existing_values)
+from src.utils.serialize import serialized_query, paginated_response, entity_response
+from src.utils.rollups import billing_rollup_states, update_billing_rollups
+from sqlalchemy import insert, select
+from decimal import Decimal
 
 billing_bp = Blueprint('billing', __name__)
 
+BULK_BILLING_REQUIRED_FIELDS = ['patient_id', 'invoice_number', 'invoice_date', 'due_date', 'billing_items']
+BULK_BILLING_ITEM_REQUIRED_FIELDS = ['service_code', 'service_description', 'unit_price']
+# Largest quantity a billing item can hold (a signed 32-bit INTEGER column)
+MAX_BILLING_ITEM_QUANTITY = 2 ** 31 - 1
+# YYYY-MM-DD fields of a billing record, parsed before they reach the record and its rollups
+BILLING_DATE_FIELDS = ['invoice_date', 'due_date', 'payment_date']
+
 @billing_bp.route('/billing', methods=['GET'])
 def get_billing_records():
-    billing_records = BillingRecord.query.all()
-    return jsonify({'billing_records': [record.to_dict() for record in billing_records]}), 200
+    return paginated_response(
+        'billing_records', BillingRecord, serialized_query(BillingRecord),
+        BillingRecord.invoice_date, BillingRecord.id
+    )
 
 @billing_bp.route('/billing/<int:record_id>', methods=['GET'])
 def get_billing_record(record_id):
-    record = BillingRecord.query.get_or_404(record_id)
-    return jsonify({'billing_record': record.to_dict()}), 200
+    return entity_response('billing_record', BillingRecord, record_id)
 
 @billing_bp.route('/billing', methods=['POST'])
 def create_billing_record():
@@ -25,6 +40,13 @@ def create_billing_record():
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
+    try:
+        for field in BILLING_DATE_FIELDS:
+            if data.get(field) is not None:
+                data[field] = parse_date(data, field)
+    except BulkItemError as e:
+        return jsonify({'error': str(e)}), 400
+    
     # Check if patient exists
     patient = Patient.query.get(data['patient_id'])
     if not patient:
@@ -47,6 +69,8 @@ def create_billing_record():
     )
     
     db.session.add(new_record)
+    db.session.flush()
+    update_billing_rollups([], billing_rollup_states(BillingRecord.id == new_record.id))
     db.session.commit()
     
     # Add billing items if provided
@@ -66,11 +90,138 @@ def create_billing_record():
     
     return jsonify({'message': 'Billing record created successfully', 'billing_record': new_record.to_dict()}), 201
 
+def _parse_bulk_billing_item(item_data):
+    """
+    Convert one billing item of a bulk invoice into an insert row with its total price derived
+    """
+    require_fields(item_data, BULK_BILLING_ITEM_REQUIRED_FIELDS)
+    quantity = parse_int(item_data, 'quantity') if item_data.get('quantity') is not None else 1
+    if not 1 <= quantity <= MAX_BILLING_ITEM_QUANTITY:
+        raise BulkItemError(f'quantity must be an integer from 1 to {MAX_BILLING_ITEM_QUANTITY}')
+    unit_price = parse_amount(item_data, 'unit_price', BillingItem.unit_price)
+    return {
+        'service_code': parse_string(item_data, 'service_code', BillingItem.service_code),
+        'service_description': parse_string(item_data, 'service_description', BillingItem.service_description),
+        'quantity': quantity,
+        'unit_price': unit_price,
+        'total_price': check_amount(unit_price * quantity, BillingItem.total_price, 'total_price')
+    }
+
+def _parse_bulk_billing_record(item):
+    """
+    Convert one bulk invoice into an insert row, deriving total_amount and balance from its items
+    """
+    require_fields(item, BULK_BILLING_REQUIRED_FIELDS)
+    if not isinstance(item['billing_items'], list) or not item['billing_items']:
+        raise BulkItemError('billing_items must be a non-empty list')
+    
+    billing_items = []
+    for position, item_data in enumerate(item['billing_items']):
+        try:
+            billing_items.append(_parse_bulk_billing_item(item_data))
+        except BulkItemError as e:
+            raise BulkItemError(f'billing_items[{position}]: {e}')
+    
+    total_amount = check_amount(
+        sum((billing_item['total_price'] for billing_item in billing_items), Decimal('0')),
+        BillingRecord.total_amount, 'total_amount'
+    )
+    paid_amount = parse_amount(item, 'paid_amount', BillingRecord.paid_amount, required=False) or Decimal('0.00')
+    if paid_amount > total_amount:
+        raise BulkItemError(f'paid_amount must not exceed the total_amount of {total_amount}')
+    return {
+        'patient_id': parse_int(item, 'patient_id'),
+        'medical_record_id': parse_int(item, 'medical_record_id') if item.get('medical_record_id') is not None else None,
+        'invoice_number': parse_string(item, 'invoice_number', BillingRecord.invoice_number),
+        'invoice_date': parse_date(item, 'invoice_date'),
+        'due_date': parse_date(item, 'due_date'),
+        'total_amount': total_amount,
+        'paid_amount': paid_amount,
+        'balance': total_amount - paid_amount,
+        'status': parse_string(item, 'status', BillingRecord.status, required=False) or 'pending',
+        'payment_method': parse_string(item, 'payment_method', BillingRecord.payment_method, required=False),
+        'payment_date': parse_date(item, 'payment_date', required=False),
+        'notes': item.get('notes'),
+        'billing_items': billing_items
+    }
+
+def _validate_billing_chunk(rows, results):
+    """
+    Check the patients, medical records and invoice numbers of a chunk of parsed rows with one IN query each
+    """
+    patient_ids = existing_values(Patient.id, [row['patient_id'] for row in rows.values()])
+    medical_record_ids = existing_values(MedicalRecord.id, [row['medical_record_id'] for row in rows.values()])
+    taken_numbers = existing_values(BillingRecord.invoice_number, [row['invoice_number'] for row in rows.values()])
+    
+    for index, row in list(rows.items()):
+        if row['patient_id'] not in patient_ids:
+            error = 'Patient not found'
+        elif row['medical_record_id'] is not None and row['medical_record_id'] not in medical_record_ids:
+            error = 'Medical record not found'
+        elif row['invoice_number'] in taken_numbers:
+            error = 'Invoice number already exists'
+        else:
+            continue
+        results[index] = {'index': index, 'status': 'error', 'error': error}
+        del rows[index]
+
+def _insert_billing_chunk(rows, results):
+    """
+    Bulk insert a chunk of validated invoices and then all of their items, recording the new ids in results
+    """
+    if not rows:
+        return
+    db.session.execute(insert(BillingRecord), [
+        {key: value for key, value in row.items() if key != 'billing_items'} for row in rows.values()
+    ])
+    
+    # Invoice numbers are unique, so they map the inserted records back to their ids
+    numbers = [row['invoice_number'] for row in rows.values()]
+    ids = dict(db.session.execute(
+        select(BillingRecord.invoice_number, BillingRecord.id).where(BillingRecord.invoice_number.in_(numbers))
+    ).all())
+    db.session.execute(insert(BillingItem), [
+        dict(billing_item, billing_record_id=ids[row['invoice_number']])
+        for row in rows.values() for billing_item in row['billing_items']
+    ])
+    update_billing_rollups([], billing_rollup_states(BillingRecord.invoice_number.in_(numbers)))
+    
+    for index, row in rows.items():
+        results[index] = {'index': index, 'status': 'created', 'id': ids[row['invoice_number']],
+                          'invoice_number': row['invoice_number'], 'total_amount': float(row['total_amount']),
+                          'balance': float(row['balance'])}
+
+@billing_bp.route('/billing/bulk', methods=['POST'])
+def create_billing_records_bulk():
+    """
+    Create many billing records with their items in one request. Each chunk of invoices is
+    validated with batched IN queries and written with two bulk INSERTs in one transaction.
+    total_amount and balance are derived from the items and paid_amount.
+    With atomic set, nothing is created unless every invoice is valid.
+    """
+    try:
+        items, atomic, chunk_size = get_bulk_request('billing_records')
+    except BulkItemError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return process_bulk(items, atomic, chunk_size, _parse_bulk_billing_record, _validate_billing_chunk,
+                        _insert_billing_chunk, ['invoice_number'], 'billing records')
+
 @billing_bp.route('/billing/<int:record_id>', methods=['PUT'])
 def update_billing_record(record_id):
     record = BillingRecord.query.get_or_404(record_id)
     data = request.get_json()
     
+    try:
+        for field in BILLING_DATE_FIELDS:
+            if data.get(field) is not None:
+                data[field] = parse_date(data, field)
+    except BulkItemError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # What the record contributes to the rollups before the update
+    old_states = billing_rollup_states(BillingRecord.id == record_id)
+    
     # Update billing record fields
     for key, value in data.items():
         if hasattr(record, key) and key != 'billing_items':
@@ -93,6 +244,8 @@ def update_billing_record(record_id):
             )
             db.session.add(item)
     
+    db.session.flush()
+    update_billing_rollups(old_states, billing_rollup_states(BillingRecord.id == record_id))
     db.session.commit()
     
     return jsonify({'message': 'Billing record updated successfully', 'billing_record': record.to_dict()}), 200
@@ -105,7 +258,9 @@ def delete_billing_record(record_id):
     BillingItem.query.filter_by(billing_record_id=record_id).delete()
     
     # Delete the billing record
+    old_states = billing_rollup_states(BillingRecord.id == record_id)
     db.session.delete(record)
+    update_billing_rollups(old_states, [])
     db.session.commit()
     
     return jsonify({'message': 'Billing record deleted successfully'}), 200
@@ -116,6 +271,7 @@ def get_billing_items(record_id):
     record = BillingRecord.query.get_or_404(record_id)
     
     # Get all billing items for the record
-    items = BillingItem.query.filter_by(billing_record_id=record_id).all()
-    
-    return jsonify({'billing_items': [item.to_dict() for item in items]}), 200
+    return paginated_response(
+        'billing_items', BillingItem, serialized_query(BillingItem).filter_by(billing_record_id=record_id),
+        BillingItem.id
+    )
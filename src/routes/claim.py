@@ -5,19 +5,27 @@ from src.models.billing import BillingRecord
 from src.models.hmo_provider import HMOProvider
 from src.models.insurance import InsuranceDetail
 from src.models.user import User
+from src.utils.bulk import (BulkItemError, get_bulk_request, process_bulk, require_fields, parse_date,
+                            parse_amount, parse_string, parse_int, existing_values)
+from src.utils.serialize import serialized_query, paginated_response, entity_response
+from src.utils.rollups import claim_rollup_states, update_claim_rollups
+from sqlalchemy import insert, select
 from datetime import datetime
 
 claim_bp = Blueprint('claim', __name__)
 
+CLAIM_REQUIRED_FIELDS = ['billing_record_id', 'hmo_id', 'insurance_detail_id', 'claim_number',
+                         'submission_date', 'service_date', 'total_amount']
+# YYYY-MM-DD fields of a claim, parsed before they reach the claim and its rollups
+CLAIM_DATE_FIELDS = ['submission_date', 'service_date', 'payment_date']
+
 @claim_bp.route('/claims', methods=['GET'])
 def get_claims():
-    claims = Claim.query.all()
-    return jsonify({'claims': [claim.to_dict() for claim in claims]}), 200
+    return paginated_response('claims', Claim, serialized_query(Claim), Claim.submission_date, Claim.id)
 
 @claim_bp.route('/claims/<int:claim_id>', methods=['GET'])
 def get_claim(claim_id):
-    claim = Claim.query.get_or_404(claim_id)
-    return jsonify({'claim': claim.to_dict()}), 200
+    return entity_response('claim', Claim, claim_id)
 
 @claim_bp.route('/claims', methods=['POST'])
 def create_claim():
@@ -30,6 +38,13 @@ def create_claim():
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
+    try:
+        for field in CLAIM_DATE_FIELDS:
+            if data.get(field) is not None:
+                data[field] = parse_date(data, field)
+    except BulkItemError as e:
+        return jsonify({'error': str(e)}), 400
+    
     # Check if billing record exists
     billing_record = BillingRecord.query.get(data['billing_record_id'])
     if not billing_record:
@@ -63,20 +78,113 @@ def create_claim():
     )
     
     db.session.add(new_claim)
+    db.session.flush()
+    update_claim_rollups([], claim_rollup_states(Claim.id == new_claim.id))
     db.session.commit()
     
     return jsonify({'message': 'Claim created successfully', 'claim': new_claim.to_dict()}), 201
 
+def _parse_bulk_claim(item):
+    """
+    Convert one bulk claim item into an insert row, without touching the database
+    """
+    require_fields(item, CLAIM_REQUIRED_FIELDS)
+    return {
+        'billing_record_id': parse_int(item, 'billing_record_id'),
+        'hmo_id': parse_int(item, 'hmo_id'),
+        'insurance_detail_id': parse_int(item, 'insurance_detail_id'),
+        'claim_number': parse_string(item, 'claim_number', Claim.claim_number),
+        'submission_date': parse_date(item, 'submission_date'),
+        'service_date': parse_date(item, 'service_date'),
+        'total_amount': parse_amount(item, 'total_amount', Claim.total_amount),
+        'approved_amount': parse_amount(item, 'approved_amount', Claim.approved_amount, required=False),
+        'status': parse_string(item, 'status', Claim.status, required=False) or 'pending',
+        'denial_reason': item.get('denial_reason'),
+        'payment_date': parse_date(item, 'payment_date', required=False),
+        'payment_amount': parse_amount(item, 'payment_amount', Claim.payment_amount, required=False),
+        'notes': item.get('notes')
+    }
+
+def _validate_claim_chunk(rows, results):
+    """
+    Check the foreign keys and claim numbers of a chunk of parsed rows with one IN query each.
+    rows maps item index to row; failing items are removed from rows and recorded in results.
+    """
+    billing_record_ids = existing_values(BillingRecord.id, [row['billing_record_id'] for row in rows.values()])
+    hmo_ids = existing_values(HMOProvider.id, [row['hmo_id'] for row in rows.values()])
+    insurance_detail_ids = existing_values(InsuranceDetail.id, [row['insurance_detail_id'] for row in rows.values()])
+    taken_numbers = existing_values(Claim.claim_number, [row['claim_number'] for row in rows.values()])
+    
+    for index, row in list(rows.items()):
+        if row['billing_record_id'] not in billing_record_ids:
+            error = 'Billing record not found'
+        elif row['hmo_id'] not in hmo_ids:
+            error = 'HMO provider not found'
+        elif row['insurance_detail_id'] not in insurance_detail_ids:
+            error = 'Insurance detail not found'
+        elif row['claim_number'] in taken_numbers:
+            error = 'Claim number already exists'
+        else:
+            continue
+        results[index] = {'index': index, 'status': 'error', 'error': error}
+        del rows[index]
+
+def _insert_claim_chunk(rows, results):
+    """
+    Bulk insert a chunk of validated rows and refresh their rollups, recording the new ids in results
+    """
+    if not rows:
+        return
+    db.session.execute(insert(Claim), list(rows.values()))
+    
+    # Claim numbers are unique, so they map the inserted rows back to their ids
+    numbers = [row['claim_number'] for row in rows.values()]
+    ids = dict(db.session.execute(
+        select(Claim.claim_number, Claim.id).where(Claim.claim_number.in_(numbers))
+    ).all())
+    update_claim_rollups([], claim_rollup_states(Claim.claim_number.in_(numbers)))
+    
+    for index, row in rows.items():
+        results[index] = {'index': index, 'status': 'created', 'id': ids[row['claim_number']],
+                          'claim_number': row['claim_number']}
+
+@claim_bp.route('/claims/bulk', methods=['POST'])
+def create_claims_bulk():
+    """
+    Create many claims in one request. Items are validated with batched IN queries and
+    inserted with one bulk INSERT and one commit per chunk; each item gets its own result.
+    With atomic set, nothing is created unless every item is valid.
+    """
+    try:
+        items, atomic, chunk_size = get_bulk_request('claims')
+    except BulkItemError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return process_bulk(items, atomic, chunk_size, _parse_bulk_claim, _validate_claim_chunk,
+                        _insert_claim_chunk, ['claim_number'], 'claims')
+
 @claim_bp.route('/claims/<int:claim_id>', methods=['PUT'])
 def update_claim(claim_id):
     claim = Claim.query.get_or_404(claim_id)
     data = request.get_json()
     
+    try:
+        for field in CLAIM_DATE_FIELDS:
+            if data.get(field) is not None:
+                data[field] = parse_date(data, field)
+    except BulkItemError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # What the claim contributes to the rollups before the update
+    old_states = claim_rollup_states(Claim.id == claim_id)
+    
     # Update claim fields
     for key, value in data.items():
         if hasattr(claim, key):
             setattr(claim, key, value)
     
+    db.session.flush()
+    update_claim_rollups(old_states, claim_rollup_states(Claim.id == claim_id))
     db.session.commit()
     
     return jsonify({'message': 'Claim updated successfully', 'claim': claim.to_dict()}), 200
@@ -89,17 +197,23 @@ def delete_claim(claim_id):
     ClaimReconciliation.query.filter_by(claim_id=claim_id).delete()
     
     # Delete the claim
+    old_states = claim_rollup_states(Claim.id == claim_id)
     db.session.delete(claim)
+    update_claim_rollups(old_states, [])
     db.session.commit()
     
     return jsonify({'message': 'Claim deleted successfully'}), 200
 
 @claim_bp.route('/claims/by-status/<status>', methods=['GET'])
 def get_claims_by_status(status):
-    claims = Claim.query.filter_by(status=status).all()
-    return jsonify({'claims': [claim.to_dict() for claim in claims]}), 200
+    return paginated_response(
+        'claims', Claim, serialized_query(Claim).filter_by(status=status),
+        Claim.submission_date, Claim.id
+    )
 
 @claim_bp.route('/claims/by-hmo/<int:hmo_id>', methods=['GET'])
 def get_claims_by_hmo(hmo_id):
-    claims = Claim.query.filter_by(hmo_id=hmo_id).all()
-    return jsonify({'claims': [claim.to_dict() for claim in claims]}), 200
+    return paginated_response(
+        'claims', Claim, serialized_query(Claim).filter_by(hmo_id=hmo_id),
+        Claim.submission_date, Claim.id
+    )
@@ -1,18 +1,20 @@
 from flask import Blueprint, request, jsonify, render_template
 from src.models.hmo_provider import HMOProvider, db
 from src.models.hmo_contract import HMOContract
+from src.utils.serialize import serialized_query, paginated_response, entity_response
 
 hmo_bp = Blueprint('hmo', __name__)
 
 @hmo_bp.route('/hmo-providers', methods=['GET'])
 def get_hmo_providers():
-    hmo_providers = HMOProvider.query.all()
-    return jsonify({'hmo_providers': [provider.to_dict() for provider in hmo_providers]}), 200
+    return paginated_response(
+        'hmo_providers', HMOProvider, serialized_query(HMOProvider),
+        HMOProvider.name, HMOProvider.id
+    )
 
 @hmo_bp.route('/hmo-providers/<int:provider_id>', methods=['GET'])
 def get_hmo_provider(provider_id):
-    provider = HMOProvider.query.get_or_404(provider_id)
-    return jsonify({'hmo_provider': provider.to_dict()}), 200
+    return entity_response('hmo_provider', HMOProvider, provider_id)
 
 @hmo_bp.route('/hmo-providers', methods=['POST'])
 def create_hmo_provider():
@@ -70,13 +72,14 @@ def delete_hmo_provider(provider_id):
 
 @hmo_bp.route('/hmo-contracts', methods=['GET'])
 def get_hmo_contracts():
-    contracts = HMOContract.query.all()
-    return jsonify({'hmo_contracts': [contract.to_dict() for contract in contracts]}), 200
+    return paginated_response(
+        'hmo_contracts', HMOContract, serialized_query(HMOContract),
+        HMOContract.start_date, HMOContract.id
+    )
 
 @hmo_bp.route('/hmo-contracts/<int:contract_id>', methods=['GET'])
 def get_hmo_contract(contract_id):
-    contract = HMOContract.query.get_or_404(contract_id)
-    return jsonify({'hmo_contract': contract.to_dict()}), 200
+    return entity_response('hmo_contract', HMOContract, contract_id)
 
 @hmo_bp.route('/hmo-contracts', methods=['POST'])
 def create_hmo_contract():
@@ -141,6 +144,7 @@ def get_provider_contracts(provider_id):
     provider = HMOProvider.query.get_or_404(provider_id)
     
     # Get all contracts for the provider
-    contracts = HMOContract.query.filter_by(hmo_id=provider_id).all()
-    
-    return jsonify({'hmo_contracts': [contract.to_dict() for contract in contracts]}), 200
+    return paginated_response(
+        'hmo_contracts', HMOContract, serialized_query(HMOContract).filter_by(hmo_id=provider_id),
+        HMOContract.start_date, HMOContract.id
+    )
@@ -2,18 +2,20 @@ from flask import Blueprint, request, jsonify
 from src.models.insurance import InsuranceDetail, db
 from src.models.patient import Patient
 from src.models.hmo_provider import HMOProvider
+from src.utils.serialize import serialized_query, paginated_response, entity_response
 
 insurance_bp = Blueprint('insurance', __name__)
 
 @insurance_bp.route('/insurance', methods=['GET'])
 def get_insurance_details():
-    insurance_details = InsuranceDetail.query.all()
-    return jsonify({'insurance_details': [detail.to_dict() for detail in insurance_details]}), 200
+    return paginated_response(
+        'insurance_details', InsuranceDetail, serialized_query(InsuranceDetail),
+        InsuranceDetail.coverage_start_date, InsuranceDetail.id
+    )
 
 @insurance_bp.route('/insurance/<int:detail_id>', methods=['GET'])
 def get_insurance_detail(detail_id):
-    detail = InsuranceDetail.query.get_or_404(detail_id)
-    return jsonify({'insurance_detail': detail.to_dict()}), 200
+    return entity_response('insurance_detail', InsuranceDetail, detail_id)
 
 @insurance_bp.route('/insurance', methods=['POST'])
 def create_insurance_detail():
@@ -84,9 +86,10 @@ def get_patient_insurance_details(patient_id):
     patient = Patient.query.get_or_404(patient_id)
     
     # Get all insurance details for the patient
-    details = InsuranceDetail.query.filter_by(patient_id=patient_id).all()
-    
-    return jsonify({'insurance_details': [detail.to_dict() for detail in details]}), 200
+    return paginated_response(
+        'insurance_details', InsuranceDetail, serialized_query(InsuranceDetail).filter_by(patient_id=patient_id),
+        InsuranceDetail.coverage_start_date, InsuranceDetail.id
+    )
 
 @insurance_bp.route('/insurance/by-hmo/<int:hmo_id>', methods=['GET'])
 def get_hmo_insurance_details(hmo_id):
@@ -94,6 +97,7 @@ def get_hmo_insurance_details(hmo_id):
     hmo_provider = HMOProvider.query.get_or_404(hmo_id)
     
     # Get all insurance details for the HMO provider
-    details = InsuranceDetail.query.filter_by(hmo_id=hmo_id).all()
-    
-    return jsonify({'insurance_details': [detail.to_dict() for detail in details]}), 200
+    return paginated_response(
+        'insurance_details', InsuranceDetail, serialized_query(InsuranceDetail).filter_by(hmo_id=hmo_id),
+        InsuranceDetail.coverage_start_date, InsuranceDetail.id
+    )
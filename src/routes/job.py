@@ -0,0 +1,65 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.models.job import Job, JobResultChunk, db
+from src.jobs import JobError, cancel_job, enqueue_job
+import json
+
+job_bp = Blueprint('job', __name__)
+
+@job_bp.route('/jobs', methods=['POST'])
+def create_job():
+    data = request.get_json()
+    
+    # Check if required fields are present
+    if 'job_type' not in data:
+        return jsonify({'error': 'Missing required field: job_type'}), 400
+    
+    try:
+        job = enqueue_job(data['job_type'], data.get('params', {}))
+    except JobError as error:
+        return jsonify({'error': str(error)}), 400
+    
+    return jsonify({'message': 'Job queued successfully', 'job': job.to_dict()}), 202
+
+@job_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    return jsonify({'job': job.to_dict()}), 200
+
+@job_bp.route('/jobs/<int:job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = Job.query.get_or_404(job_id)
+    
+    # A failed job is a known outcome of the job, not a fault of this request
+    if job.status == 'failed':
+        return jsonify({'error': f'Job failed: {job.error}', 'job': job.to_dict()}), 409
+    if job.status != 'succeeded':
+        return jsonify({'error': f'Job is {job.status}', 'job': job.to_dict()}), 409
+    
+    # The result is stored as JSON; splice it in rather than decoding and re-encoding it
+    prefix = '{"job_id": ' + json.dumps(job.id) + ', "result": '
+    if job.result is not None:
+        return Response(prefix + job.result + '}', mimetype='application/json'), 200
+    
+    # A result written in chunks is streamed one chunk at a time
+    chunks = db.session.query(JobResultChunk.data).filter(
+        JobResultChunk.job_id == job.id
+    ).order_by(JobResultChunk.seq)
+    
+    def generate():
+        yield prefix
+        for data, in chunks.yield_per(1):
+            yield data
+        yield '}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json'), 200
+
+@job_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel(job_id):
+    job = Job.query.get_or_404(job_id)
+    
+    if job.status not in ('queued', 'running'):
+        return jsonify({'error': f'Job is already {job.status}', 'job': job.to_dict()}), 409
+    
+    job = cancel_job(job)
+    
+    return jsonify({'message': 'Job cancellation requested', 'job': job.to_dict()}), 200
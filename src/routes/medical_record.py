@@ -1,18 +1,20 @@
 from flask import Blueprint, request, jsonify
 from src.models.medical_record import MedicalRecord, db
 from src.models.patient import Patient
+from src.utils.serialize import serialized_query, paginated_response, entity_response
 
 medical_record_bp = Blueprint('medical_record', __name__)
 
 @medical_record_bp.route('/medical_records', methods=['GET'])
 def get_medical_records():
-    medical_records = MedicalRecord.query.all()
-    return jsonify({'medical_records': [record.to_dict() for record in medical_records]}), 200
+    return paginated_response(
+        'medical_records', MedicalRecord, serialized_query(MedicalRecord),
+        MedicalRecord.visit_date, MedicalRecord.id
+    )
 
 @medical_record_bp.route('/medical_records/<int:record_id>', methods=['GET'])
 def get_medical_record(record_id):
-    record = MedicalRecord.query.get_or_404(record_id)
-    return jsonify({'medical_record': record.to_dict()}), 200
+    return entity_response('medical_record', MedicalRecord, record_id)
 
 @medical_record_bp.route('/medical_records', methods=['POST'])
 def create_medical_record():
@@ -1,18 +1,17 @@
 from flask import Blueprint, request, jsonify
 from src.models.patient import Patient, db
 from src.models.medical_record import MedicalRecord
+from src.utils.serialize import serialized_query, paginated_response, entity_response
 
 patient_bp = Blueprint('patient', __name__)
 
 @patient_bp.route('/patients', methods=['GET'])
 def get_patients():
-    patients = Patient.query.all()
-    return jsonify({'patients': [patient.to_dict() for patient in patients]}), 200
+    return paginated_response('patients', Patient, serialized_query(Patient), Patient.last_name, Patient.id)
 
 @patient_bp.route('/patients/<int:patient_id>', methods=['GET'])
 def get_patient(patient_id):
-    patient = Patient.query.get_or_404(patient_id)
-    return jsonify({'patient': patient.to_dict()}), 200
+    return entity_response('patient', Patient, patient_id)
 
 @patient_bp.route('/patients', methods=['POST'])
 def create_patient():
@@ -77,6 +76,7 @@ def get_patient_medical_records(patient_id):
     patient = Patient.query.get_or_404(patient_id)
     
     # Get all medical records for the patient
-    medical_records = MedicalRecord.query.filter_by(patient_id=patient_id).all()
-    
-    return jsonify({'medical_records': [record.to_dict() for record in medical_records]}), 200
+    return paginated_response(
+        'medical_records', MedicalRecord, serialized_query(MedicalRecord).filter_by(patient_id=patient_id),
+        MedicalRecord.visit_date, MedicalRecord.id
+    )
@@ -2,20 +2,30 @@ from flask import Blueprint, request, jsonify
 from src.models.claim_reconciliation import ClaimReconciliation, db
 from src.models.claim import Claim
 from src.models.billing import BillingRecord
+from src.models.hmo_provider import HMOProvider
 from src.models.user import User
+from src.utils.serialize import serialized_query, paginated_response, entity_response
+from src.utils.bulk import check_amount
+from src.utils.rollups import claim_rollup_states, update_claim_rollups
+from sqlalchemy import and_, case, exists, func, insert, literal, select, update
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+import csv
+import io
 
 reconciliation_bp = Blueprint('reconciliation', __name__)
 
 @reconciliation_bp.route('/reconciliations', methods=['GET'])
 def get_reconciliations():
-    reconciliations = ClaimReconciliation.query.all()
-    return jsonify({'reconciliations': [rec.to_dict() for rec in reconciliations]}), 200
+    return paginated_response(
+        'reconciliations', ClaimReconciliation, serialized_query(ClaimReconciliation),
+        ClaimReconciliation.reconciliation_date, ClaimReconciliation.id
+    )
 
 @reconciliation_bp.route('/reconciliations/<int:reconciliation_id>', methods=['GET'])
 def get_reconciliation(reconciliation_id):
-    reconciliation = ClaimReconciliation.query.get_or_404(reconciliation_id)
-    return jsonify({'reconciliation': reconciliation.to_dict()}), 200
+    return entity_response('reconciliation', ClaimReconciliation, reconciliation_id)
 
 @reconciliation_bp.route('/reconciliations', methods=['POST'])
 def create_reconciliation():
@@ -65,7 +75,7 @@ def update_reconciliation(reconciliation_id):
     
     # Update reconciliation fields
     for key, value in data.items():
-        if hasattr(reconciliation, key):
+        if hasattr(reconciliation, key) and key != 'remittance_source':
             setattr(reconciliation, key, value)
     
     db.session.commit()
@@ -74,13 +84,127 @@ def update_reconciliation(reconciliation_id):
 
 @reconciliation_bp.route('/reconciliations/by-claim/<int:claim_id>', methods=['GET'])
 def get_reconciliations_by_claim(claim_id):
-    reconciliations = ClaimReconciliation.query.filter_by(claim_id=claim_id).all()
-    return jsonify({'reconciliations': [rec.to_dict() for rec in reconciliations]}), 200
+    return paginated_response(
+        'reconciliations', ClaimReconciliation, serialized_query(ClaimReconciliation).filter_by(claim_id=claim_id),
+        ClaimReconciliation.reconciliation_date, ClaimReconciliation.id
+    )
 
 @reconciliation_bp.route('/reconciliations/by-status/<status>', methods=['GET'])
 def get_reconciliations_by_status(status):
-    reconciliations = ClaimReconciliation.query.filter_by(resolution_status=status).all()
-    return jsonify({'reconciliations': [rec.to_dict() for rec in reconciliations]}), 200
+    return paginated_response(
+        'reconciliations', ClaimReconciliation, serialized_query(ClaimReconciliation).filter_by(resolution_status=status),
+        ClaimReconciliation.reconciliation_date, ClaimReconciliation.id
+    )
+
+# Claims reconciled per INSERT ... SELECT / commit during auto-reconciliation
+AUTO_RECONCILE_CHUNK_SIZE = 5000
+MAX_AUTO_RECONCILE_CHUNK_SIZE = 50000
+
+def _reconciliation_values():
+    """
+    SQL expressions for the amounts and outcome of reconciling a claim as it currently stands
+    """
+    billed_amount = Claim.total_amount
+    approved_amount = func.coalesce(Claim.approved_amount, 0)
+    paid_amount = func.coalesce(Claim.payment_amount, 0)
+    variance_amount = billed_amount - paid_amount
+    
+    # Determine variance reason and action
+    variance_reason = case(
+        (variance_amount == 0, 'No variance'),
+        (and_(variance_amount > 0, approved_amount < billed_amount), 'Partial approval by HMO'),
+        (variance_amount > 0, 'Approved but underpaid'),
+        else_='Overpayment'
+    )
+    action_taken = case(
+        (variance_amount == 0, 'accepted'),
+        (and_(variance_amount > 0, approved_amount < billed_amount), 'accepted'),
+        (variance_amount > 0, 'disputed'),
+        else_='adjusted'
+    )
+    resolution_status = case(
+        (variance_amount == 0, 'resolved'),
+        (and_(variance_amount > 0, approved_amount < billed_amount), 'resolved'),
+        else_='pending'
+    )
+    
+    return {
+        'billed_amount': billed_amount,
+        'approved_amount': approved_amount,
+        'paid_amount': paid_amount,
+        'variance_amount': variance_amount,
+        'variance_reason': variance_reason,
+        'action_taken': action_taken,
+        'resolution_status': resolution_status
+    }
+
+def _insert_reconciliations(values, reconciliation_date, user_id, notes, criteria):
+    """
+    Create one reconciliation per claim matching criteria with a single INSERT ... SELECT
+    """
+    return db.session.execute(
+        insert(ClaimReconciliation).from_select(
+            ['claim_id', 'reconciliation_date', *values, 'notes', 'created_by'],
+            select(
+                Claim.id,
+                literal(reconciliation_date),
+                *values.values(),
+                literal(notes),
+                literal(user_id)
+            ).where(*criteria)
+        )
+    )
+
+def auto_reconcile(user_id, chunk_size=AUTO_RECONCILE_CHUNK_SIZE, progress=None):
+    """
+    Reconcile every approved or partially approved claim that has no reconciliation yet.
+
+    The work is done set-based: each chunk of claim ids is reconciled by one
+    INSERT ... SELECT that decides variance reason, action and status with CASE
+    expressions over a NOT EXISTS anti-join, and is committed on its own so locks
+    are held only for one chunk. `progress`, if given, is called with
+    (claims_done, claims_total) after each chunk. Returns summary counts.
+    """
+    now = datetime.utcnow()
+    values = _reconciliation_values()
+    action_taken = values['action_taken']
+    resolution_status = values['resolution_status']
+    
+    # Claims that need reconciliation (approved or partially approved but not reconciled)
+    eligible = [
+        Claim.status.in_(['approved', 'partially_approved']),
+        ~exists().where(ClaimReconciliation.claim_id == Claim.id)
+    ]
+    
+    min_id, max_id = db.session.query(func.min(Claim.id), func.max(Claim.id)).one()
+    
+    summary = {'reconciled_count': 0, 'chunks': 0, 'by_action': {}, 'by_status': {}}
+    if min_id is None:
+        return summary
+    
+    lower = min_id - 1
+    while lower < max_id:
+        upper = lower + chunk_size
+        chunk = eligible + [Claim.id > lower, Claim.id <= upper]
+        
+        # Breakdown of what this chunk is about to create
+        for action, status, count in db.session.query(
+            action_taken, resolution_status, func.count(Claim.id)
+        ).filter(*chunk).group_by(action_taken, resolution_status):
+            summary['by_action'][action] = summary['by_action'].get(action, 0) + count
+            summary['by_status'][status] = summary['by_status'].get(status, 0) + count
+        
+        result = _insert_reconciliations(values, now.date(), user_id, f"Auto-reconciled on {now}", chunk)
+        db.session.commit()
+        
+        summary['reconciled_count'] += result.rowcount
+        summary['chunks'] += 1
+        lower = upper
+        
+        if progress:
+            progress(min(upper, max_id) - min_id + 1, max_id - min_id + 1)
+    
+    return summary
 
 @reconciliation_bp.route('/reconciliations/auto-reconcile', methods=['POST'])
 def auto_reconcile_claims():
@@ -97,65 +221,206 @@ def auto_reconcile_claims():
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    # Get claims that need reconciliation (approved or partially approved but not reconciled)
-    claims_to_reconcile = Claim.query.filter(
-        Claim.status.in_(['approved', 'partially_approved']),
-        ~Claim.id.in_(
-            db.session.query(ClaimReconciliation.claim_id)
-        )
-    ).all()
+    try:
+        chunk_size = int(data.get('chunk_size', AUTO_RECONCILE_CHUNK_SIZE))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'chunk_size must be an integer'}), 400
+    if chunk_size < 1:
+        return jsonify({'error': 'chunk_size must be a positive integer'}), 400
+    
+    summary = auto_reconcile(data['user_id'], min(chunk_size, MAX_AUTO_RECONCILE_CHUNK_SIZE))
+    
+    return jsonify({
+        'message': f"{summary['reconciled_count']} claims auto-reconciled successfully",
+        **summary
+    }), 200
+
+# Remittance lines matched, applied and committed together during ingestion
+REMITTANCE_BATCH_SIZE = 2000
+# Columns a remittance CSV must have
+REMITTANCE_COLUMNS = ['claim_number', 'approved_amount', 'paid_amount', 'payment_date']
+# Problem lines listed per category in the ingestion summary; all of them are counted
+MAX_REPORTED_REMITTANCE_LINES = 1000
+# Notes of reconciliations created from a remittance
+REMITTANCE_NOTES = 'Remittance {source} imported on {imported_at}'
+
+class RemittanceError(ValueError):
+    """
+    Raised when a remittance file cannot be read at all
+    """
+
+def _parse_remittance_line(row):
+    """
+    Parse one remittance CSV row into (claim_number, approved_amount, paid_amount, payment_date)
+    """
+    claim_number = (row.get('claim_number') or '').strip()
+    if not claim_number:
+        raise ValueError('Missing claim_number')
+    amounts = []
+    # Checked against the claim columns they are written to
+    for field, column in (('approved_amount', Claim.approved_amount), ('paid_amount', Claim.payment_amount)):
+        try:
+            amount = Decimal(row[field].strip())
+        except (AttributeError, InvalidOperation):
+            raise ValueError(f'{field} must be a number')
+        if not amount.is_finite():
+            raise ValueError(f'{field} must be a number')
+        if amount < 0:
+            raise ValueError(f'{field} must not be negative')
+        amounts.append(check_amount(amount, column, field))
+    approved_amount, paid_amount = amounts
+    try:
+        payment_date = datetime.strptime((row['payment_date'] or '').strip(), '%Y-%m-%d').date()
+    except (AttributeError, ValueError):
+        raise ValueError('Invalid payment_date format. Use YYYY-MM-DD')
+    return claim_number, approved_amount, paid_amount, payment_date
+
+def _remittance_status(total_amount, approved_amount):
+    """
+    Claim status implied by the amount the HMO approved
+    """
+    if approved_amount >= total_amount:
+        return 'approved'
+    if approved_amount > 0:
+        return 'partially_approved'
+    return 'denied'
+
+def ingest_remittance(stream, user_id, hmo_id=None, batch_size=REMITTANCE_BATCH_SIZE, source='remittance'):
+    """
+    Apply an HMO remittance CSV to its claims and reconcile them.
+
+    The file is read from the text stream one batch of lines at a time, so memory use does
+    not grow with the file. Each batch is matched to claims with one IN lookup on the unique
+    claim_number index, built into a dict keyed by claim number. Matched claims get their
+    approved amount, payment amount, payment date and status in one bulk UPDATE, are
+    reconciled by one INSERT ... SELECT using the auto-reconcile rules, the changes are
+    applied to the claim rollups, and the batch is committed. Lines with no claim (or a claim
+    of another HMO when hmo_id is given) are unmatched; a claim paid on more than one line is
+    ambiguous and only its first line is applied; a claim that already has a reconciliation
+    with a remittance_source, from this or an earlier import, is a duplicate and left as it
+    is, so re-sent or overlapping files are not applied twice.
+    Returns summary counts and the first problem lines of each kind.
+    """
+    reader = csv.DictReader(stream)
+    missing = [column for column in REMITTANCE_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise RemittanceError(f"Missing remittance column(s): {', '.join(missing)}")
+    
+    now = datetime.utcnow()
+    notes = REMITTANCE_NOTES.format(source=source, imported_at=now)
+    source = source[:ClaimReconciliation.remittance_source.type.length]
+    values = {**_reconciliation_values(), 'remittance_source': literal(source)}
+    # Claims already paid by a remittance, this run included; remittance_source cannot be edited through the API
+    remitted = [ClaimReconciliation.remittance_source.isnot(None)]
+    summary = {
+        'lines': 0, 'matched': 0, 'reconciled_count': 0, 'unmatched_count': 0, 'ambiguous_count': 0,
+        'duplicate_count': 0, 'invalid_count': 0, 'unmatched': [], 'ambiguous': [], 'duplicate': [], 'invalid': []
+    }
     
-    reconciliations_created = []
+    def report(kind, line, claim_number, error):
+        summary[f'{kind}_count'] += 1
+        if len(summary[kind]) < MAX_REPORTED_REMITTANCE_LINES:
+            summary[kind].append({'line': line, 'claim_number': claim_number, 'error': error})
     
-    for claim in claims_to_reconcile:
-        # Calculate variance
-        billed_amount = float(claim.total_amount)
-        approved_amount = float(claim.approved_amount) if claim.approved_amount else 0
-        paid_amount = float(claim.payment_amount) if claim.payment_amount else 0
-        variance_amount = billed_amount - paid_amount
+    rows = ((reader.line_num, row) for row in reader)
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            summary['lines'] += len(batch)
         
-        # Determine variance reason and action
-        if variance_amount == 0:
-            variance_reason = "No variance"
-            action_taken = "accepted"
-            resolution_status = "resolved"
-        elif variance_amount > 0:
-            if approved_amount < billed_amount:
-                variance_reason = "Partial approval by HMO"
-                action_taken = "accepted"
-                resolution_status = "resolved"
-            else:
-                variance_reason = "Approved but underpaid"
-                action_taken = "disputed"
-                resolution_status = "pending"
-        else:
-            variance_reason = "Overpayment"
-            action_taken = "adjusted"
-            resolution_status = "pending"
+            parsed = []
+            for line, row in batch:
+                try:
+                    parsed.append((line, *_parse_remittance_line(row)))
+                except ValueError as e:
+                    report('invalid', line, (row.get('claim_number') or '').strip() or None, str(e))
         
-        # Create reconciliation record
-        new_reconciliation = ClaimReconciliation(
-            claim_id=claim.id,
-            reconciliation_date=datetime.utcnow().date(),
-            billed_amount=billed_amount,
-            approved_amount=approved_amount,
-            paid_amount=paid_amount,
-            variance_amount=variance_amount,
-            variance_reason=variance_reason,
-            action_taken=action_taken,
-            resolution_status=resolution_status,
-            notes=f"Auto-reconciled on {datetime.utcnow()}",
-            created_by=data['user_id']
-        )
+            claims = {
+                claim.claim_number: claim for claim in db.session.execute(
+                    select(Claim.id, Claim.claim_number, Claim.hmo_id, Claim.submission_date, Claim.total_amount)
+                    .where(Claim.claim_number.in_({line[1] for line in parsed}))
+                )
+            } if parsed else {}
+            already_paid = set(db.session.execute(
+                select(ClaimReconciliation.claim_id).where(
+                    ClaimReconciliation.claim_id.in_([claim.id for claim in claims.values()]),
+                    *remitted
+                ).distinct()
+            ).scalars()) if claims else set()
+        
+            updates = {}
+            for line, claim_number, approved_amount, paid_amount, payment_date in parsed:
+                claim = claims.get(claim_number)
+                if claim is None:
+                    report('unmatched', line, claim_number, 'No claim with this claim number')
+                elif hmo_id is not None and claim.hmo_id != hmo_id:
+                    report('unmatched', line, claim_number, 'Claim belongs to another HMO')
+                elif claim.id in updates:
+                    report('ambiguous', line, claim_number, 'Claim appears on more than one remittance line')
+                elif claim.id in already_paid:
+                    report('duplicate', line, claim_number, 'Claim was already paid by a remittance')
+                else:
+                    updates[claim.id] = {
+                        'id': claim.id,
+                        'approved_amount': approved_amount,
+                        'payment_amount': paid_amount,
+                        'payment_date': payment_date,
+                        'status': _remittance_status(claim.total_amount, approved_amount)
+                    }
         
-        db.session.add(new_reconciliation)
-        reconciliations_created.append(new_reconciliation)
+            if updates:
+                applied = Claim.id.in_(list(updates))
+                old_states = claim_rollup_states(applied)
+                db.session.execute(update(Claim), list(updates.values()))
+                # The anti-join also skips claims a concurrent import reconciled since the lookup
+                result = _insert_reconciliations(values, now.date(), user_id, notes, [
+                    Claim.id.in_(list(updates)),
+                    ~exists().where(ClaimReconciliation.claim_id == Claim.id, *remitted)
+                ])
+                # In the batch's transaction, so the rollups never disagree with committed claims
+                update_claim_rollups(old_states, claim_rollup_states(applied))
+                summary['matched'] += len(updates)
+                summary['reconciled_count'] += result.rowcount
+            db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        raise
     
-    db.session.commit()
+    return summary
+
+@reconciliation_bp.route('/reconciliations/remittance', methods=['POST'])
+def ingest_remittance_file():
+    """
+    Ingest an HMO remittance CSV uploaded as the `file` form field
+    """
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'A remittance CSV file is required'}), 400
+    
+    user_id = request.form.get('user_id', type=int)
+    if user_id is None:
+        return jsonify({'error': 'User ID is required'}), 400
+    if not User.query.get(user_id):
+        return jsonify({'error': 'User not found'}), 404
+    
+    hmo_id = request.form.get('hmo_id', type=int)
+    if hmo_id is not None and not HMOProvider.query.get(hmo_id):
+        return jsonify({'error': 'HMO provider not found'}), 404
+    
+    try:
+        summary = ingest_remittance(
+            io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''),
+            user_id, hmo_id, source=upload.filename or 'upload'
+        )
+    except (RemittanceError, UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'message': f'{len(reconciliations_created)} claims auto-reconciled successfully',
-        'reconciliations': [rec.to_dict() for rec in reconciliations_created]
+        'message': f"{summary['matched']} of {summary['lines']} remittance lines applied",
+        **summary
     }), 200
 
 @reconciliation_bp.route('/reconciliations/report', methods=['GET'])
@@ -163,33 +428,58 @@ def get_reconciliation_report():
     """
     Generate a reconciliation report with summary statistics
     """
-    # Get all reconciliations
-    reconciliations = ClaimReconciliation.query.all()
+    filters = []
     
-    # Calculate summary statistics
-    total_count = len(reconciliations)
-    total_billed = sum(float(rec.billed_amount) for rec in reconciliations)
-    total_approved = sum(float(rec.approved_amount) for rec in reconciliations)
-    total_paid = sum(float(rec.paid_amount) for rec in reconciliations)
-    total_variance = sum(float(rec.variance_amount) for rec in reconciliations)
+    # Optional date range on reconciliation_date and HMO filter
+    try:
+        if request.args.get('start_date'):
+            filters.append(ClaimReconciliation.reconciliation_date >= datetime.strptime(request.args['start_date'], '%Y-%m-%d').date())
+        if request.args.get('end_date'):
+            filters.append(ClaimReconciliation.reconciliation_date <= datetime.strptime(request.args['end_date'], '%Y-%m-%d').date())
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    
+    try:
+        hmo_id = int(request.args['hmo_id']) if request.args.get('hmo_id') else None
+    except ValueError:
+        return jsonify({'error': 'hmo_id must be an integer'}), 400
+    
+    # Totals and status/action breakdowns from one grouped aggregate
+    query = db.session.query(
+        ClaimReconciliation.resolution_status,
+        ClaimReconciliation.action_taken,
+        func.count(ClaimReconciliation.id),
+        func.sum(ClaimReconciliation.billed_amount),
+        func.sum(ClaimReconciliation.approved_amount),
+        func.sum(ClaimReconciliation.paid_amount),
+        func.sum(ClaimReconciliation.variance_amount)
+    )
+    if hmo_id is not None:
+        query = query.join(Claim, Claim.id == ClaimReconciliation.claim_id)
+        filters.append(Claim.hmo_id == hmo_id)
     
-    # Count by status
+    breakdown = query.filter(*filters).group_by(
+        ClaimReconciliation.resolution_status,
+        ClaimReconciliation.action_taken
+    ).all()
+    
+    # Calculate summary statistics
+    total_count = 0
+    total_billed = 0
+    total_approved = 0
+    total_paid = 0
+    total_variance = 0
     status_counts = {}
-    for rec in reconciliations:
-        status = rec.resolution_status
-        if status in status_counts:
-            status_counts[status] += 1
-        else:
-            status_counts[status] = 1
-    
-    # Count by action
     action_counts = {}
-    for rec in reconciliations:
-        action = rec.action_taken
-        if action in action_counts:
-            action_counts[action] += 1
-        else:
-            action_counts[action] = 1
+    
+    for status, action, count, billed, approved, paid, variance in breakdown:
+        total_count += count
+        total_billed += float(billed or 0)
+        total_approved += float(approved or 0)
+        total_paid += float(paid or 0)
+        total_variance += float(variance or 0)
+        status_counts[status] = status_counts.get(status, 0) + count
+        action_counts[action] = action_counts.get(action, 0) + count
     
     return jsonify({
         'summary': {
@@ -1,17 +1,23 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from src.models.claim import Claim, db
 from src.models.claim_reconciliation import ClaimReconciliation
 from src.models.billing import BillingRecord
 from src.models.billing_item import BillingItem
 from src.models.hmo_provider import HMOProvider
 from src.models.patient import Patient
-from sqlalchemy import func, desc
+from src.models.rollup import BillingDailyRollup, ClaimDailyRollup, ClaimProcessingDailyRollup
+from src.utils.pagination import keyset_query, cursor_for
+from src.utils.report_cache import cached_report
+from src.utils.query_stats import query_budget
+from sqlalchemy import func, desc, case
 from datetime import datetime, timedelta
 import json
 
 reporting_bp = Blueprint('reporting', __name__)
 
 @reporting_bp.route('/reports/financial-summary', methods=['GET'])
+@query_budget(2)
+@cached_report('billing_daily_rollups', 'claim_daily_rollups')
 def financial_summary_report():
     """
     Generate a financial summary report with revenue, outstanding claims, and collection metrics
@@ -31,59 +37,39 @@ def financial_summary_report():
     else:
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
     
-    # Total billing amount
-    total_billed = db.session.query(func.sum(BillingRecord.total_amount)).filter(
-        BillingRecord.invoice_date >= start_date,
-        BillingRecord.invoice_date <= end_date
-    ).scalar() or 0
-    
-    # Total payments received
-    total_paid = db.session.query(func.sum(BillingRecord.paid_amount)).filter(
-        BillingRecord.invoice_date >= start_date,
-        BillingRecord.invoice_date <= end_date
-    ).scalar() or 0
-    
-    # Outstanding balance
-    outstanding_balance = db.session.query(func.sum(BillingRecord.balance)).filter(
-        BillingRecord.invoice_date >= start_date,
-        BillingRecord.invoice_date <= end_date
-    ).scalar() or 0
-    
-    # Claims statistics
-    total_claims = Claim.query.filter(
-        Claim.submission_date >= start_date,
-        Claim.submission_date <= end_date
-    ).count()
-    
-    approved_claims = Claim.query.filter(
-        Claim.submission_date >= start_date,
-        Claim.submission_date <= end_date,
-        Claim.status == 'approved'
-    ).count()
-    
-    pending_claims = Claim.query.filter(
-        Claim.submission_date >= start_date,
-        Claim.submission_date <= end_date,
-        Claim.status == 'pending'
-    ).count()
-    
-    denied_claims = Claim.query.filter(
-        Claim.submission_date >= start_date,
-        Claim.submission_date <= end_date,
-        Claim.status == 'denied'
-    ).count()
-    
-    # Claims amount statistics
-    total_claim_amount = db.session.query(func.sum(Claim.total_amount)).filter(
-        Claim.submission_date >= start_date,
-        Claim.submission_date <= end_date
-    ).scalar() or 0
-    
-    approved_claim_amount = db.session.query(func.sum(Claim.approved_amount)).filter(
-        Claim.submission_date >= start_date,
-        Claim.submission_date <= end_date,
-        Claim.status.in_(['approved', 'partially_approved'])
-    ).scalar() or 0
+    # Billing totals from the daily billing rollup
+    billing_totals = db.session.query(
+        func.sum(BillingDailyRollup.total_amount),
+        func.sum(BillingDailyRollup.paid_amount),
+        func.sum(BillingDailyRollup.balance)
+    ).filter(
+        BillingDailyRollup.day >= start_date,
+        BillingDailyRollup.day <= end_date
+    ).one()
+    
+    total_billed = billing_totals[0] or 0
+    total_paid = billing_totals[1] or 0
+    outstanding_balance = billing_totals[2] or 0
+    
+    # Claims counts and amounts from the daily claim rollup, using conditional aggregates
+    claim_totals = db.session.query(
+        func.sum(ClaimDailyRollup.claim_count),
+        func.sum(case((ClaimDailyRollup.status == 'approved', ClaimDailyRollup.claim_count))),
+        func.sum(case((ClaimDailyRollup.status == 'pending', ClaimDailyRollup.claim_count))),
+        func.sum(case((ClaimDailyRollup.status == 'denied', ClaimDailyRollup.claim_count))),
+        func.sum(ClaimDailyRollup.billed_amount),
+        func.sum(case((ClaimDailyRollup.status.in_(['approved', 'partially_approved']), ClaimDailyRollup.approved_amount)))
+    ).filter(
+        ClaimDailyRollup.day >= start_date,
+        ClaimDailyRollup.day <= end_date
+    ).one()
+    
+    total_claims = int(claim_totals[0] or 0)
+    approved_claims = int(claim_totals[1] or 0)
+    pending_claims = int(claim_totals[2] or 0)
+    denied_claims = int(claim_totals[3] or 0)
+    total_claim_amount = claim_totals[4] or 0
+    approved_claim_amount = claim_totals[5] or 0
     
     # Collection rate
     collection_rate = (total_paid / total_billed * 100) if total_billed > 0 else 0
@@ -113,7 +99,20 @@ def financial_summary_report():
         }
     }), 200
 
+def _histogram_percentile(histogram, total, fraction):
+    """
+    Nearest-rank percentile of a sorted [(value, count), ...] histogram holding `total` observations
+    """
+    seen = 0
+    for value, count in histogram:
+        seen += count
+        if seen >= total * fraction:
+            return float(value)
+    return None
+
 @reporting_bp.route('/reports/hmo-performance', methods=['GET'])
+@query_budget(2)
+@cached_report('claim_daily_rollups', 'claim_processing_daily_rollups', 'hmo_providers')
 def hmo_performance_report():
     """
     Generate a report on HMO performance metrics
@@ -133,107 +132,87 @@ def hmo_performance_report():
     else:
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
     
-    # Get all HMO providers
-    hmo_providers = HMOProvider.query.all()
+    # All per-HMO counts and amounts from the daily claim rollup, joined to provider names.
+    # The inner join skips HMOs with no claims in this period.
+    hmo_rows = db.session.query(
+        HMOProvider.id,
+        HMOProvider.name,
+        func.sum(ClaimDailyRollup.claim_count).label('total_claims'),
+        func.sum(case((ClaimDailyRollup.status == 'approved', ClaimDailyRollup.claim_count))).label('approved_claims'),
+        func.sum(case((ClaimDailyRollup.status == 'partially_approved', ClaimDailyRollup.claim_count))).label('partially_approved_claims'),
+        func.sum(case((ClaimDailyRollup.status == 'denied', ClaimDailyRollup.claim_count))).label('denied_claims'),
+        func.sum(case((ClaimDailyRollup.status == 'pending', ClaimDailyRollup.claim_count))).label('pending_claims'),
+        func.sum(ClaimDailyRollup.billed_amount).label('total_billed'),
+        func.sum(case((ClaimDailyRollup.status.in_(['approved', 'partially_approved']), ClaimDailyRollup.approved_amount))).label('total_approved'),
+        func.sum(ClaimDailyRollup.paid_amount).label('total_paid')
+    ).join(
+        ClaimDailyRollup, ClaimDailyRollup.hmo_id == HMOProvider.id
+    ).filter(
+        ClaimDailyRollup.day >= start_date,
+        ClaimDailyRollup.day <= end_date
+    ).group_by(
+        HMOProvider.id, HMOProvider.name
+    ).order_by(
+        HMOProvider.id
+    ).all()
+    
+    # Processing time (days between submission and payment) histogram per HMO, in ascending order
+    processing_rows = db.session.query(
+        ClaimProcessingDailyRollup.hmo_id,
+        ClaimProcessingDailyRollup.processing_days,
+        func.sum(ClaimProcessingDailyRollup.claim_count)
+    ).filter(
+        ClaimProcessingDailyRollup.day >= start_date,
+        ClaimProcessingDailyRollup.day <= end_date
+    ).group_by(
+        ClaimProcessingDailyRollup.hmo_id,
+        ClaimProcessingDailyRollup.processing_days
+    ).order_by(
+        ClaimProcessingDailyRollup.hmo_id,
+        ClaimProcessingDailyRollup.processing_days
+    ).all()
+    
+    processing_histograms = {}
+    for hmo_id, days, count in processing_rows:
+        processing_histograms.setdefault(hmo_id, []).append((days, int(count)))
     
     hmo_performance = []
     
-    for hmo in hmo_providers:
-        # Total claims for this HMO
-        total_claims = Claim.query.filter(
-            Claim.submission_date >= start_date,
-            Claim.submission_date <= end_date,
-            Claim.hmo_id == hmo.id
-        ).count()
-        
-        if total_claims == 0:
-            continue  # Skip HMOs with no claims in this period
-        
-        # Approved claims
-        approved_claims = Claim.query.filter(
-            Claim.submission_date >= start_date,
-            Claim.submission_date <= end_date,
-            Claim.hmo_id == hmo.id,
-            Claim.status == 'approved'
-        ).count()
-        
-        # Partially approved claims
-        partially_approved_claims = Claim.query.filter(
-            Claim.submission_date >= start_date,
-            Claim.submission_date <= end_date,
-            Claim.hmo_id == hmo.id,
-            Claim.status == 'partially_approved'
-        ).count()
-        
-        # Denied claims
-        denied_claims = Claim.query.filter(
-            Claim.submission_date >= start_date,
-            Claim.submission_date <= end_date,
-            Claim.hmo_id == hmo.id,
-            Claim.status == 'denied'
-        ).count()
-        
-        # Pending claims
-        pending_claims = Claim.query.filter(
-            Claim.submission_date >= start_date,
-            Claim.submission_date <= end_date,
-            Claim.hmo_id == hmo.id,
-            Claim.status == 'pending'
-        ).count()
-        
-        # Total amount billed to this HMO
-        total_billed = db.session.query(func.sum(Claim.total_amount)).filter(
-            Claim.submission_date >= start_date,
-            Claim.submission_date <= end_date,
-            Claim.hmo_id == hmo.id
-        ).scalar() or 0
+    for row in hmo_rows:
+        total_claims = int(row.total_claims)
+        approved_claims = int(row.approved_claims or 0)
+        partially_approved_claims = int(row.partially_approved_claims or 0)
+        total_billed = row.total_billed or 0
+        total_paid = row.total_paid or 0
         
-        # Total amount approved by this HMO
-        total_approved = db.session.query(func.sum(Claim.approved_amount)).filter(
-            Claim.submission_date >= start_date,
-            Claim.submission_date <= end_date,
-            Claim.hmo_id == hmo.id,
-            Claim.status.in_(['approved', 'partially_approved'])
-        ).scalar() or 0
-        
-        # Total amount paid by this HMO
-        total_paid = db.session.query(func.sum(Claim.payment_amount)).filter(
-            Claim.submission_date >= start_date,
-            Claim.submission_date <= end_date,
-            Claim.hmo_id == hmo.id,
-            Claim.payment_amount.isnot(None)
-        ).scalar() or 0
-        
-        # Average processing time (days between submission and payment)
-        processing_time_query = db.session.query(
-            func.avg(func.julianday(Claim.payment_date) - func.julianday(Claim.submission_date))
-        ).filter(
-            Claim.submission_date >= start_date,
-            Claim.submission_date <= end_date,
-            Claim.hmo_id == hmo.id,
-            Claim.payment_date.isnot(None)
-        ).scalar()
-        
-        avg_processing_time = float(processing_time_query) if processing_time_query else None
+        # Average and nearest-rank p50/p90 processing time from the histogram
+        histogram = processing_histograms.get(row.id, [])
+        paid_count = sum(count for days, count in histogram)
+        avg_processing_time = (sum(days * count for days, count in histogram) / paid_count) if paid_count else None
+        avg_processing_time = float(avg_processing_time) if avg_processing_time else None
+        p50_processing_time = _histogram_percentile(histogram, paid_count, 0.5)
+        p90_processing_time = _histogram_percentile(histogram, paid_count, 0.9)
         
         # Calculate approval and payment rates
         approval_rate = ((approved_claims + partially_approved_claims) / total_claims * 100) if total_claims > 0 else 0
         payment_rate = (total_paid / total_billed * 100) if total_billed > 0 else 0
         
         hmo_performance.append({
-            'hmo_id': hmo.id,
-            'hmo_name': hmo.name,
+            'hmo_id': row.id,
+            'hmo_name': row.name,
             'total_claims': total_claims,
             'approved_claims': approved_claims,
             'partially_approved_claims': partially_approved_claims,
-            'denied_claims': denied_claims,
-            'pending_claims': pending_claims,
+            'denied_claims': int(row.denied_claims or 0),
+            'pending_claims': int(row.pending_claims or 0),
             'approval_rate': float(approval_rate),
             'total_billed': float(total_billed),
-            'total_approved': float(total_approved),
+            'total_approved': float(row.total_approved or 0),
             'total_paid': float(total_paid),
             'payment_rate': float(payment_rate),
-            'avg_processing_time_days': avg_processing_time
+            'avg_processing_time_days': avg_processing_time,
+            'p50_processing_time_days': p50_processing_time,
+            'p90_processing_time_days': p90_processing_time
         })
     
     # Sort by approval rate (descending)
@@ -247,64 +226,109 @@ def hmo_performance_report():
         'hmo_performance': hmo_performance
     }), 200
 
+# Upper bounds (in days) of the default aging buckets; anything older falls in over_<last>
+DEFAULT_AGING_BUCKETS = [30, 60, 90, 120]
+
 @reporting_bp.route('/reports/claim-aging', methods=['GET'])
+@query_budget(1)
+@cached_report('claims', 'hmo_providers')
 def claim_aging_report():
     """
     Generate a report on aging claims by time periods
     """
     today = datetime.utcnow().date()
     
-    # Define aging buckets (in days)
-    buckets = {
-        '0-30': (0, 30),
-        '31-60': (31, 60),
-        '61-90': (61, 90),
-        '91-120': (91, 120),
-        'over_120': (121, 9999)
-    }
-    
-    aging_report = {}
-    
-    for bucket_name, (min_days, max_days) in buckets.items():
-        min_date = today - timedelta(days=max_days)
-        max_date = today - timedelta(days=min_days) if min_days > 0 else today
-        
-        # Count claims in this bucket
-        claims_count = Claim.query.filter(
-            Claim.submission_date >= min_date,
-            Claim.submission_date <= max_date,
-            Claim.status.in_(['pending', 'partially_approved'])
-        ).count()
+    # Bucket boundaries, e.g. ?buckets=30,60,90,120
+    buckets_str = request.args.get('buckets')
+    if buckets_str:
+        try:
+            boundaries = [int(value) for value in buckets_str.split(',')]
+        except ValueError:
+            return jsonify({'error': 'buckets must be a comma-separated list of integers'}), 400
+        if any(value <= 0 for value in boundaries) or boundaries != sorted(set(boundaries)):
+            return jsonify({'error': 'buckets must be positive and strictly increasing'}), 400
+    else:
+        boundaries = DEFAULT_AGING_BUCKETS
+    
+    by_hmo = request.args.get('by_hmo', 'false').lower() in ('1', 'true', 'yes')
+    
+    # Name each bucket and map it to the oldest submission date it covers
+    bucket_names = []
+    whens = [(Claim.submission_date > today, None)]  # future-dated claims fall in no bucket
+    lower = 0
+    for upper in boundaries:
+        name = f'{lower}-{upper}' if lower == 0 else f'{lower + 1}-{upper}'
+        bucket_names.append(name)
+        whens.append((Claim.submission_date >= today - timedelta(days=upper), name))
+        lower = upper
+    oldest_bucket = f'over_{boundaries[-1]}'
+    bucket_names.append(oldest_bucket)
+    bucket = case(*whens, else_=oldest_bucket).label('bucket')
+    
+    # One grouped scan of open claims; the totals are summed from the same rows
+    columns = [bucket, func.count(Claim.id), func.sum(Claim.total_amount)]
+    group_by = [bucket]
+    if by_hmo:
+        columns += [HMOProvider.id, HMOProvider.name]
+        group_by += [HMOProvider.id, HMOProvider.name]
+    
+    query = db.session.query(*columns).filter(
+        Claim.status.in_(['pending', 'partially_approved'])
+    )
+    if by_hmo:
+        query = query.join(HMOProvider, HMOProvider.id == Claim.hmo_id)
+    rows = query.group_by(*group_by).all()
+    
+    def empty_buckets():
+        return {name: {'claims_count': 0, 'claims_amount': 0.0} for name in bucket_names}
+    
+    aging_report = empty_buckets()
+    hmo_reports = {}
+    total_pending_claims = 0
+    total_pending_amount = 0
+    
+    for row in rows:
+        bucket_name, claims_count, claims_amount = row[0], row[1], float(row[2] or 0)
+        total_pending_claims += claims_count
+        total_pending_amount += claims_amount
         
-        # Sum claim amounts in this bucket
-        claims_amount = db.session.query(func.sum(Claim.total_amount)).filter(
-            Claim.submission_date >= min_date,
-            Claim.submission_date <= max_date,
-            Claim.status.in_(['pending', 'partially_approved'])
-        ).scalar() or 0
+        if bucket_name is not None:
+            aging_report[bucket_name]['claims_count'] += claims_count
+            aging_report[bucket_name]['claims_amount'] += claims_amount
         
-        aging_report[bucket_name] = {
-            'claims_count': claims_count,
-            'claims_amount': float(claims_amount)
-        }
-    
-    # Get total pending claims
-    total_pending_claims = Claim.query.filter(
-        Claim.status.in_(['pending', 'partially_approved'])
-    ).count()
-    
-    total_pending_amount = db.session.query(func.sum(Claim.total_amount)).filter(
-        Claim.status.in_(['pending', 'partially_approved'])
-    ).scalar() or 0
-    
-    return jsonify({
+        if by_hmo:
+            hmo_report = hmo_reports.setdefault(row[3], {
+                'hmo_id': row[3],
+                'hmo_name': row[4],
+                'total_pending_claims': 0,
+                'total_pending_amount': 0.0,
+                'aging_buckets': empty_buckets()
+            })
+            hmo_report['total_pending_claims'] += claims_count
+            hmo_report['total_pending_amount'] += claims_amount
+            if bucket_name is not None:
+                hmo_report['aging_buckets'][bucket_name]['claims_count'] += claims_count
+                hmo_report['aging_buckets'][bucket_name]['claims_amount'] += claims_amount
+    
+    report = {
         'report_date': today.isoformat(),
         'total_pending_claims': total_pending_claims,
         'total_pending_amount': float(total_pending_amount),
         'aging_buckets': aging_report
-    }), 200
+    }
+    
+    if by_hmo:
+        report['by_hmo'] = sorted(hmo_reports.values(), key=lambda x: x['total_pending_amount'], reverse=True)
+    
+    return jsonify(report), 200
+
+# Default and maximum number of entries in the denial reason / HMO rankings
+DEFAULT_DENIAL_TOP_N = 20
+MAX_DENIAL_TOP_N = 100
 
 @reporting_bp.route('/reports/denial-analysis', methods=['GET'])
+@query_budget(3)
+@cached_report('claims', 'claim_daily_rollups', 'hmo_providers')
 def denial_analysis_report():
     """
     Generate a report analyzing claim denials and their reasons
@@ -324,66 +348,72 @@ def denial_analysis_report():
     else:
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
     
-    # Get all denied claims in the period
-    denied_claims = Claim.query.filter(
+    # Number of reasons / HMOs to return, e.g. ?top=10
+    try:
+        top = min(int(request.args.get('top', DEFAULT_DENIAL_TOP_N)), MAX_DENIAL_TOP_N)
+    except ValueError:
+        return jsonify({'error': 'top must be an integer'}), 400
+    if top < 1:
+        return jsonify({'error': 'top must be a positive integer'}), 400
+    
+    period_filter = [
         Claim.submission_date >= start_date,
-        Claim.submission_date <= end_date,
-        Claim.status == 'denied'
-    ).all()
+        Claim.submission_date <= end_date
+    ]
+    rollup_period_filter = [
+        ClaimDailyRollup.day >= start_date,
+        ClaimDailyRollup.day <= end_date
+    ]
     
-    # Analyze denial reasons
-    denial_reasons = {}
+    # Total and denied claim counts from the daily claim rollup
+    total_claims, denied_count = db.session.query(
+        func.sum(ClaimDailyRollup.claim_count),
+        func.sum(case((ClaimDailyRollup.status == 'denied', ClaimDailyRollup.claim_count)))
+    ).filter(*rollup_period_filter).one()
+    total_claims = int(total_claims or 0)
+    denied_count = int(denied_count or 0)
+    
+    denial_rate = (denied_count / total_claims * 100) if total_claims > 0 else 0
+    
+    # Analyze denial reasons; reasons are free text and not rolled up, so this reads
+    # only the denied claims of the period through the (submission_date, status) index
+    reason = func.coalesce(Claim.denial_reason, 'Unspecified')
+    reason_count = func.count(Claim.id)
+    denial_reasons = db.session.query(
+        reason, reason_count, func.sum(Claim.total_amount)
+    ).filter(
+        *period_filter,
+        Claim.status == 'denied'
+    ).group_by(
+        reason
+    ).order_by(
+        desc(reason_count), reason
+    ).limit(top).all()
     
-    for claim in denied_claims:
-        reason = claim.denial_reason or 'Unspecified'
-        
-        if reason in denial_reasons:
-            denial_reasons[reason]['count'] += 1
-            denial_reasons[reason]['amount'] += float(claim.total_amount)
-        else:
-            denial_reasons[reason] = {
-                'count': 1,
-                'amount': float(claim.total_amount)
-            }
-    
-    # Convert to list and sort by count
     denial_reasons_list = [
-        {'reason': reason, 'count': data['count'], 'amount': data['amount']}
-        for reason, data in denial_reasons.items()
+        {'reason': reason, 'count': count, 'amount': float(amount or 0)}
+        for reason, count, amount in denial_reasons
     ]
-    denial_reasons_list.sort(key=lambda x: x['count'], reverse=True)
-    
-    # Get denial rate
-    total_claims = Claim.query.filter(
-        Claim.submission_date >= start_date,
-        Claim.submission_date <= end_date
-    ).count()
     
-    denial_rate = (len(denied_claims) / total_claims * 100) if total_claims > 0 else 0
+    # Get denials by HMO from the daily claim rollup
+    hmo_count = func.sum(ClaimDailyRollup.claim_count)
+    denials_by_hmo = db.session.query(
+        ClaimDailyRollup.hmo_id, HMOProvider.name, hmo_count, func.sum(ClaimDailyRollup.billed_amount)
+    ).outerjoin(
+        HMOProvider, HMOProvider.id == ClaimDailyRollup.hmo_id
+    ).filter(
+        *rollup_period_filter,
+        ClaimDailyRollup.status == 'denied'
+    ).group_by(
+        ClaimDailyRollup.hmo_id, HMOProvider.name
+    ).order_by(
+        desc(hmo_count), ClaimDailyRollup.hmo_id
+    ).limit(top).all()
     
-    # Get denials by HMO
-    denials_by_hmo = {}
-    
-    for claim in denied_claims:
-        hmo_id = claim.hmo_id
-        hmo = HMOProvider.query.get(hmo_id)
-        hmo_name = hmo.name if hmo else f"HMO ID {hmo_id}"
-        
-        if hmo_name in denials_by_hmo:
-            denials_by_hmo[hmo_name]['count'] += 1
-            denials_by_hmo[hmo_name]['amount'] += float(claim.total_amount)
-        else:
-            denials_by_hmo[hmo_name] = {
-                'count': 1,
-                'amount': float(claim.total_amount)
-            }
-    
-    # Convert to list and sort by count
     denials_by_hmo_list = [
-        {'hmo': hmo, 'count': data['count'], 'amount': data['amount']}
-        for hmo, data in denials_by_hmo.items()
+        {'hmo': hmo_name or f"HMO ID {hmo_id}", 'count': int(count), 'amount': float(amount or 0)}
+        for hmo_id, hmo_name, count, amount in denials_by_hmo
     ]
-    denials_by_hmo_list.sort(key=lambda x: x['count'], reverse=True)
     
     return jsonify({
         'date_range': {
@@ -391,20 +421,22 @@ def denial_analysis_report():
             'end_date': end_date.isoformat()
         },
         'total_claims': total_claims,
-        'denied_claims': len(denied_claims),
+        'denied_claims': denied_count,
         'denial_rate': float(denial_rate),
         'denial_reasons': denial_reasons_list,
         'denials_by_hmo': denials_by_hmo_list
     }), 200
 
-@reporting_bp.route('/reports/reconciliation-audit', methods=['GET'])
-def reconciliation_audit_report():
+# Rows fetched from the database cursor at a time while streaming audit entries
+AUDIT_STREAM_BATCH_SIZE = 500
+
+def reconciliation_audit_period(args):
     """
-    Generate an audit report for claim reconciliations
+    The (start_date, end_date) of an audit report from its query arguments, the
+    last 30 days by default; raises ValueError for a malformed date
     """
-    # Get query parameters for date range
-    start_date_str = request.args.get('start_date')
-    end_date_str = request.args.get('end_date')
+    start_date_str = args.get('start_date')
+    end_date_str = args.get('end_date')
     
     # Default to last 30 days if not specified
     if not end_date_str:
@@ -417,65 +449,47 @@ def reconciliation_audit_report():
     else:
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
     
-    # Get all reconciliations in the period
-    reconciliations = ClaimReconciliation.query.filter(
+    return start_date, end_date
+
+def reconciliation_audit_head(start_date, end_date):
+    """
+    Everything in the audit report but its entries: the period, totals and breakdowns
+    """
+    # Totals and status/action breakdowns from one grouped aggregate
+    breakdown = db.session.query(
+        ClaimReconciliation.resolution_status,
+        ClaimReconciliation.action_taken,
+        func.count(ClaimReconciliation.id),
+        func.sum(ClaimReconciliation.billed_amount),
+        func.sum(ClaimReconciliation.approved_amount),
+        func.sum(ClaimReconciliation.paid_amount),
+        func.sum(ClaimReconciliation.variance_amount)
+    ).filter(
         ClaimReconciliation.reconciliation_date >= start_date,
         ClaimReconciliation.reconciliation_date <= end_date
+    ).group_by(
+        ClaimReconciliation.resolution_status,
+        ClaimReconciliation.action_taken
     ).all()
     
-    # Prepare detailed audit data
-    audit_entries = []
-    
-    for rec in reconciliations:
-        claim = Claim.query.get(rec.claim_id)
-        if not claim:
-            continue
-            
-        billing_record = BillingRecord.query.get(claim.billing_record_id) if claim else None
-        hmo = HMOProvider.query.get(claim.hmo_id) if claim else None
-        
-        audit_entries.append({
-            'reconciliation_id': rec.id,
-            'reconciliation_date': rec.reconciliation_date.isoformat() if rec.reconciliation_date else None,
-            'claim_id': rec.claim_id,
-            'claim_number': claim.claim_number if claim else None,
-            'hmo_name': hmo.name if hmo else None,
-            'invoice_number': billing_record.invoice_number if billing_record else None,
-            'billed_amount': float(rec.billed_amount),
-            'approved_amount': float(rec.approved_amount),
-            'paid_amount': float(rec.paid_amount),
-            'variance_amount': float(rec.variance_amount),
-            'variance_reason': rec.variance_reason,
-            'action_taken': rec.action_taken,
-            'resolution_status': rec.resolution_status
-        })
-    
-    # Summary statistics
-    total_reconciliations = len(reconciliations)
-    total_billed = sum(float(rec.billed_amount) for rec in reconciliations)
-    total_approved = sum(float(rec.approved_amount) for rec in reconciliations)
-    total_paid = sum(float(rec.paid_amount) for rec in reconciliations)
-    total_variance = sum(float(rec.variance_amount) for rec in reconciliations)
-    
-    # Count by status
+    total_reconciliations = 0
+    total_billed = 0
+    total_approved = 0
+    total_paid = 0
+    total_variance = 0
     status_counts = {}
-    for rec in reconciliations:
-        status = rec.resolution_status
-        if status in status_counts:
-            status_counts[status] += 1
-        else:
-            status_counts[status] = 1
-    
-    # Count by action
     action_counts = {}
-    for rec in reconciliations:
-        action = rec.action_taken
-        if action in action_counts:
-            action_counts[action] += 1
-        else:
-            action_counts[action] = 1
     
-    return jsonify({
+    for status, action, count, billed, approved, paid, variance in breakdown:
+        total_reconciliations += count
+        total_billed += float(billed or 0)
+        total_approved += float(approved or 0)
+        total_paid += float(paid or 0)
+        total_variance += float(variance or 0)
+        status_counts[status] = status_counts.get(status, 0) + count
+        action_counts[action] = action_counts.get(action, 0) + count
+    
+    return {
         'date_range': {
             'start_date': start_date.isoformat(),
             'end_date': end_date.isoformat()
@@ -490,6 +504,89 @@ def reconciliation_audit_report():
             'collection_rate': float(total_paid / total_billed * 100) if total_billed > 0 else 0
         },
         'by_status': status_counts,
-        'by_action': action_counts,
-        'audit_entries': audit_entries
-    }), 200
+        'by_action': action_counts
+    }
+
+# Sort key of the audit entries, unique through the trailing id
+AUDIT_SORT_COLUMNS = [ClaimReconciliation.reconciliation_date, ClaimReconciliation.id]
+
+def reconciliation_audit_entries(start_date, end_date):
+    """
+    Unordered query of the period's audit entries with their claim, invoice and HMO in one join
+    """
+    return db.session.query(
+        ClaimReconciliation.id,
+        ClaimReconciliation.reconciliation_date,
+        ClaimReconciliation.claim_id,
+        Claim.claim_number,
+        HMOProvider.name.label('hmo_name'),
+        BillingRecord.invoice_number,
+        ClaimReconciliation.billed_amount,
+        ClaimReconciliation.approved_amount,
+        ClaimReconciliation.paid_amount,
+        ClaimReconciliation.variance_amount,
+        ClaimReconciliation.variance_reason,
+        ClaimReconciliation.action_taken,
+        ClaimReconciliation.resolution_status
+    ).join(
+        Claim, Claim.id == ClaimReconciliation.claim_id
+    ).outerjoin(
+        BillingRecord, BillingRecord.id == Claim.billing_record_id
+    ).outerjoin(
+        HMOProvider, HMOProvider.id == Claim.hmo_id
+    ).filter(
+        ClaimReconciliation.reconciliation_date >= start_date,
+        ClaimReconciliation.reconciliation_date <= end_date
+    )
+
+def audit_entry(row):
+    """
+    The JSON form of one row of reconciliation_audit_entries
+    """
+    return {
+        'reconciliation_id': row.id,
+        'reconciliation_date': row.reconciliation_date.isoformat() if row.reconciliation_date else None,
+        'claim_id': row.claim_id,
+        'claim_number': row.claim_number,
+        'hmo_name': row.hmo_name,
+        'invoice_number': row.invoice_number,
+        'billed_amount': float(row.billed_amount),
+        'approved_amount': float(row.approved_amount),
+        'paid_amount': float(row.paid_amount),
+        'variance_amount': float(row.variance_amount),
+        'variance_reason': row.variance_reason,
+        'action_taken': row.action_taken,
+        'resolution_status': row.resolution_status
+    }
+
+@reporting_bp.route('/reports/reconciliation-audit', methods=['GET'])
+@query_budget(2)
+def reconciliation_audit_report():
+    """
+    Generate an audit report for claim reconciliations
+    """
+    start_date, end_date = reconciliation_audit_period(request.args)
+    head = reconciliation_audit_head(start_date, end_date)
+    
+    # Audit entries one page at a time
+    entries_query, limit = keyset_query(reconciliation_audit_entries(start_date, end_date), *AUDIT_SORT_COLUMNS)
+    
+    def generate():
+        # Everything but the entries is already computed; emit it and leave the array open
+        yield json.dumps(head)[:-1] + ', "audit_entries": ['
+        
+        count = 0
+        last = None
+        next_cursor = None
+        for row in entries_query.yield_per(AUDIT_STREAM_BATCH_SIZE):
+            if count == limit:
+                next_cursor = cursor_for(last, AUDIT_SORT_COLUMNS)
+                break
+            
+            yield (', ' if count else '') + json.dumps(audit_entry(row))
+            count += 1
+            last = row
+        
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json'), 200
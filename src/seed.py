@@ -0,0 +1,342 @@
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+from src.models import db
+from src.models.user import User
+from src.models.patient import Patient
+from src.models.medical_record import MedicalRecord
+from src.models.appointment import Appointment
+from src.models.billing import BillingRecord
+from src.models.billing_item import BillingItem
+from src.models.insurance import InsuranceDetail
+from src.models.hmo_provider import HMOProvider
+from src.models.hmo_contract import HMOContract
+from src.models.claim import Claim
+from src.models.claim_reconciliation import ClaimReconciliation
+from src.utils.rollups import rebuild_rollups
+
+# Rows generated at --scale 1; every count is multiplied by the scale (HMOs and users have floors)
+SEED_VOLUMES = {
+    'users': 500,
+    'hmo_providers': 25,
+    'patients': 100000,
+    'medical_records': 400000,
+    'appointments': 300000,
+    'billing_records': 1000000,
+    'claims': 1000000
+}
+# Rows inserted and committed together
+SEED_CHUNK_SIZE = 5000
+# Password of every generated user, so benchmarks and manual testing can log in
+SEED_PASSWORD = 'password'
+# Days back from today that generated activity spans
+SEED_HISTORY_DAYS = 730
+
+# Roles given to generated users in turn: three doctors in every eight users
+USER_ROLES = ['doctor', 'nurse', 'doctor', 'billing', 'doctor', 'receptionist', 'nurse', 'admin']
+# Claim statuses and their base weights; each HMO scales the denied weight
+CLAIM_STATUS_WEIGHTS = {'approved': 55, 'partially_approved': 12, 'denied': 13, 'pending': 20}
+DENIAL_REASONS = ['Service not covered', 'Missing documentation', 'Duplicate claim', 'Coverage expired',
+                  'Pre-authorization required', 'Out of network']
+SERVICES = [('99213', 'Office visit, established patient', 75), ('99214', 'Office visit, moderate complexity', 110),
+            ('80053', 'Comprehensive metabolic panel', 45), ('85025', 'Complete blood count', 25),
+            ('71046', 'Chest X-ray, 2 views', 90), ('93000', 'Electrocardiogram', 60),
+            ('36415', 'Venipuncture', 12), ('99285', 'Emergency department visit', 420),
+            ('70450', 'CT head without contrast', 650), ('90471', 'Immunization administration', 20)]
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'Chinedu', 'Ngozi', 'Emeka', 'Aisha', 'Tunde', 'Fatima', 'Kofi', 'Amara', 'Yusuf', 'Zainab']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Okafor', 'Adeyemi', 'Bello', 'Mensah', 'Garcia',
+              'Miller', 'Davis', 'Okonkwo', 'Ibrahim', 'Wilson', 'Moore', 'Taylor', 'Eze', 'Abubakar', 'Clark']
+CITIES = [('Lagos', 'LA'), ('Abuja', 'FC'), ('Port Harcourt', 'RI'), ('Ibadan', 'OY'), ('Kano', 'KN'), ('Enugu', 'EN')]
+
+
+class _Generator:
+    """
+    Builds insert rows for every model from one seeded random source, assigning ids
+    itself so related rows can be linked without reading anything back
+    """
+
+    def __init__(self, scale, seed):
+        self.random = random.Random(seed)
+        self.scale = scale
+        self.today = date.today()
+        self.next_ids = {}
+
+    def count(self, name, minimum=1):
+        return max(minimum, int(SEED_VOLUMES[name] * self.scale))
+
+    def ids(self, model, count):
+        """
+        Reserve count new ids after the highest existing id of model
+        """
+        start = self.next_ids.get(model)
+        if start is None:
+            start = (db.session.query(func.max(model.id)).scalar() or 0) + 1
+        self.next_ids[model] = start + count
+        return range(start, start + count)
+
+    def skewed_index(self, size, power=2.0):
+        """
+        An index in [0, size) biased towards 0, so low ids are picked far more often
+        """
+        return min(size - 1, int(size * self.random.random() ** power))
+
+    def recent_day(self):
+        """
+        A day in the generated history, denser towards today
+        """
+        return self.today - timedelta(days=int(SEED_HISTORY_DAYS * self.random.random() ** 1.5))
+
+    def timestamp(self, day):
+        return datetime.combine(day, datetime.min.time()) + timedelta(seconds=self.random.randint(8 * 3600, 18 * 3600))
+
+    def person(self):
+        return self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+
+    def phone(self):
+        return f'+234{self.random.randint(7000000000, 9099999999)}'
+
+
+def _insert(model, rows, progress):
+    """
+    Bulk insert a stream of rows in chunks, committing each chunk
+    """
+    inserted = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == SEED_CHUNK_SIZE:
+            db.session.execute(insert(model), chunk)
+            db.session.commit()
+            inserted += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(insert(model), chunk)
+        db.session.commit()
+        inserted += len(chunk)
+    progress(f'{model.__tablename__}: {inserted} rows')
+    return inserted
+
+
+def _claim_rows(gen, buffers, record_id, invoice_day, total, policies, hmo_denial_factor, billing_user_ids):
+    """
+    Add the claim of one bill, and its reconciliation if it was paid and reconciled, to buffers
+    """
+    rnd = gen.random
+    claim_id = gen.ids(Claim, 1)[0]
+    detail_id, hmo_id = rnd.choice(policies)
+    submission_day = min(gen.today, invoice_day + timedelta(days=rnd.randint(0, 20)))
+    # Claims submitted in the last month are still mostly pending
+    if submission_day > gen.today - timedelta(days=30) and rnd.random() < 0.7:
+        status = 'pending'
+    else:
+        weights = dict(CLAIM_STATUS_WEIGHTS, denied=CLAIM_STATUS_WEIGHTS['denied'] * hmo_denial_factor[hmo_id])
+        status = rnd.choices(list(weights), weights=list(weights.values()))[0]
+
+    approved = None
+    if status == 'approved':
+        approved = total
+    elif status == 'partially_approved':
+        approved = (total * Decimal(rnd.randint(50, 90)) / 100).quantize(Decimal('0.01'))
+    payment_amount = payment_date = None
+    if approved is not None and rnd.random() < 0.85:
+        payment_amount = approved if rnd.random() < 0.8 else approved - min(approved, Decimal(rnd.randint(1, 50)))
+        payment_date = min(gen.today, submission_day + timedelta(days=rnd.randint(7, 90)))
+
+    buffers[Claim].append({
+        'id': claim_id, 'billing_record_id': record_id, 'hmo_id': hmo_id, 'insurance_detail_id': detail_id,
+        'claim_number': f'CLM-{claim_id:09d}', 'submission_date': submission_day, 'service_date': invoice_day,
+        'total_amount': total, 'approved_amount': approved, 'status': status,
+        'denial_reason': rnd.choice(DENIAL_REASONS) if status == 'denied' else None,
+        'payment_date': payment_date, 'payment_amount': payment_amount, 'notes': None
+    })
+    if payment_amount is None or rnd.random() >= 0.6:
+        return
+
+    variance = total - payment_amount
+    buffers[ClaimReconciliation].append({
+        'id': gen.ids(ClaimReconciliation, 1)[0], 'claim_id': claim_id,
+        'reconciliation_date': min(gen.today, payment_date + timedelta(days=rnd.randint(0, 14))),
+        'billed_amount': total, 'approved_amount': approved, 'paid_amount': payment_amount, 'variance_amount': variance,
+        'variance_reason': None if not variance else ('Partial approval' if approved < total else 'Short payment'),
+        'action_taken': 'accepted' if not variance else rnd.choice(['accepted', 'disputed', 'adjusted']),
+        'resolution_status': 'resolved' if not variance else rnd.choices(['pending', 'resolved', 'escalated'], weights=[50, 40, 10])[0],
+        'notes': None, 'created_by': rnd.choice(billing_user_ids)
+    })
+
+
+def seed_data(scale=1.0, seed=1, progress=print):
+    """
+    Fill the database with synthetic data across every model and rebuild the rollups.
+
+    Volumes are SEED_VOLUMES times scale. HMO market share follows a Zipf-like curve,
+    each HMO has its own denial rate, activity is denser in recent months and a minority
+    of patients account for most visits, claims and bills. Returns rows inserted per table.
+    """
+    gen = _Generator(scale, seed)
+    rnd = gen.random
+    counts = {}
+
+    # Users cycle through USER_ROLES; all share one password hash
+    password_hash = generate_password_hash(SEED_PASSWORD)
+    user_ids = gen.ids(User, gen.count('users', 10))
+    user_roles = {user_id: USER_ROLES[i % len(USER_ROLES)] for i, user_id in enumerate(user_ids)}
+    doctor_ids = [user_id for user_id, role in user_roles.items() if role == 'doctor']
+    billing_user_ids = [user_id for user_id, role in user_roles.items() if role == 'billing']
+
+    def users():
+        for user_id in user_ids:
+            first_name, last_name = gen.person()
+            yield {'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+                   'password_hash': password_hash, 'first_name': first_name, 'last_name': last_name,
+                   'role': user_roles[user_id], 'is_active': True}
+    counts['users'] = _insert(User, users(), progress)
+
+    # HMOs: market share ~ 1 / rank, denial rate anywhere from half to two and a half times the base
+    hmo_ids = list(gen.ids(HMOProvider, gen.count('hmo_providers', 5)))
+    hmo_weights = [1.0 / (rank + 1) ** 1.1 for rank in range(len(hmo_ids))]
+    hmo_denial_factor = {hmo_id: rnd.uniform(0.5, 2.5) for hmo_id in hmo_ids}
+
+    def hmo_providers():
+        for hmo_id in hmo_ids:
+            city, state = rnd.choice(CITIES)
+            contact_first, contact_last = gen.person()
+            yield {'id': hmo_id, 'name': f'{rnd.choice(LAST_NAMES)} Health Plan {hmo_id}', 'address': f'{rnd.randint(1, 400)} Marina Road',
+                   'city': city, 'state': state, 'zip_code': f'{rnd.randint(100000, 999999)}', 'phone': gen.phone(),
+                   'email': f'claims@hmo{hmo_id}.example.com', 'website': f'https://hmo{hmo_id}.example.com',
+                   'contact_person': f'{contact_first} {contact_last}', 'contact_phone': gen.phone(),
+                   'contact_email': f'provider.relations@hmo{hmo_id}.example.com', 'is_active': True}
+    counts['hmo_providers'] = _insert(HMOProvider, hmo_providers(), progress)
+
+    def hmo_contracts():
+        contract_ids = iter(gen.ids(HMOContract, len(hmo_ids) * 2))
+        for hmo_id in hmo_ids:
+            for term in range(2):
+                start = gen.today - timedelta(days=365 * (2 - term))
+                yield {'id': next(contract_ids), 'hmo_id': hmo_id, 'contract_number': f'CTR-{hmo_id}-{term + 1}',
+                       'start_date': start, 'end_date': start + timedelta(days=365), 'contract_terms': 'Annual renewal',
+                       'payment_terms': f'Net {rnd.choice([30, 45, 60])}', 'service_coverage': 'Outpatient, diagnostics, emergency',
+                       'reimbursement_rates': f'{rnd.randint(70, 95)}% of billed charges',
+                       'claim_submission_guidelines': 'Submit within 90 days of service', 'is_active': term == 1}
+    counts['hmo_contracts'] = _insert(HMOContract, hmo_contracts(), progress)
+
+    # Patients, each with one or two insurance policies
+    patient_ids = gen.ids(Patient, gen.count('patients', 10))
+
+    def patients():
+        for patient_id in patient_ids:
+            first_name, last_name = gen.person()
+            city, state = rnd.choice(CITIES)
+            contact_first, contact_last = gen.person()
+            yield {'id': patient_id, 'first_name': first_name, 'last_name': last_name,
+                   'date_of_birth': gen.today - timedelta(days=rnd.randint(365, 90 * 365)), 'gender': rnd.choice(['male', 'female']),
+                   'address': f'{rnd.randint(1, 300)} Allen Avenue', 'city': city, 'state': state,
+                   'zip_code': f'{rnd.randint(100000, 999999)}', 'phone': gen.phone(),
+                   'email': f'patient{patient_id}@example.com', 'emergency_contact_name': f'{contact_first} {contact_last}',
+                   'emergency_contact_phone': gen.phone(), 'blood_type': rnd.choice(['O+', 'O-', 'A+', 'A-', 'B+', 'AB+']),
+                   'allergies': rnd.choice([None, None, None, 'Penicillin', 'Peanuts', 'Latex']), 'is_active': True}
+    counts['patients'] = _insert(Patient, patients(), progress)
+
+    # Insurance ids and HMOs per patient, for linking claims
+    patient_policies = []
+
+    def insurance_details():
+        for patient_id in patient_ids:
+            policies = []
+            for _ in range(1 if rnd.random() < 0.8 else 2):
+                detail_id = gen.ids(InsuranceDetail, 1)[0]
+                hmo_id = rnd.choices(hmo_ids, weights=hmo_weights)[0]
+                policies.append((detail_id, hmo_id))
+                start = gen.today - timedelta(days=rnd.randint(400, 3000))
+                yield {'id': detail_id, 'patient_id': patient_id, 'hmo_id': hmo_id, 'policy_number': f'POL-{detail_id:08d}',
+                       'group_number': f'GRP-{rnd.randint(100, 999)}', 'coverage_start_date': start,
+                       'coverage_end_date': None if rnd.random() < 0.9 else start + timedelta(days=730),
+                       'primary_holder_name': None, 'relationship_to_primary': rnd.choice(['self', 'self', 'spouse', 'child']),
+                       'coverage_type': rnd.choice(['full', 'full', 'partial']), 'coverage_details': None, 'is_active': True}
+            patient_policies.append(policies)
+    counts['insurance_details'] = _insert(InsuranceDetail, insurance_details(), progress)
+
+    # Visits concentrate on a minority of patients; remember which records belong to whom
+    patient_records = {}
+
+    def medical_records():
+        for record_id in gen.ids(MedicalRecord, gen.count('medical_records')):
+            index = gen.skewed_index(len(patient_ids))
+            patient_records.setdefault(index, []).append(record_id)
+            visit_day = gen.recent_day()
+            yield {'id': record_id, 'patient_id': patient_ids[index], 'doctor_id': rnd.choice(doctor_ids),
+                   'visit_date': gen.timestamp(visit_day), 'chief_complaint': rnd.choice(['Fever', 'Headache', 'Chest pain', 'Cough', 'Follow-up']),
+                   'diagnosis': rnd.choice(['Malaria', 'Hypertension', 'Upper respiratory infection', 'Type 2 diabetes', 'Gastritis']),
+                   'treatment_plan': 'As discussed', 'prescription': None, 'notes': None,
+                   'follow_up_date': visit_day + timedelta(days=14) if rnd.random() < 0.3 else None}
+    counts['medical_records'] = _insert(MedicalRecord, medical_records(), progress)
+
+    def appointments():
+        for appointment_id in gen.ids(Appointment, gen.count('appointments')):
+            day = gen.recent_day() + timedelta(days=30)
+            status = 'scheduled' if day > gen.today else rnd.choices(['completed', 'cancelled', 'no-show'], weights=[85, 10, 5])[0]
+            yield {'id': appointment_id, 'patient_id': patient_ids[gen.skewed_index(len(patient_ids))],
+                   'doctor_id': rnd.choice(doctor_ids), 'appointment_date': gen.timestamp(day),
+                   'reason': rnd.choice(['Consultation', 'Follow-up', 'Lab review', 'Vaccination']), 'status': status, 'notes': None}
+    counts['appointments'] = _insert(Appointment, appointments(), progress)
+
+    # Billing records with their items, a claim for the first `claims` bills and a
+    # reconciliation for most paid claims, generated and flushed together chunk by chunk
+    billing_count = gen.count('billing_records')
+    claim_count = gen.count('claims')
+    tables = [(BillingRecord, 'billing_records'), (BillingItem, 'billing_items'),
+              (Claim, 'claims'), (ClaimReconciliation, 'claim_reconciliations')]
+    buffers = {model: [] for model, _ in tables}
+    counts.update({name: 0 for _, name in tables})
+
+    def flush():
+        for model, name in tables:
+            if buffers[model]:
+                db.session.execute(insert(model), buffers[model])
+                counts[name] += len(buffers[model])
+                buffers[model].clear()
+        db.session.commit()
+
+    for position, record_id in enumerate(gen.ids(BillingRecord, billing_count)):
+        index = gen.skewed_index(len(patient_ids))
+        invoice_day = gen.recent_day()
+        total = Decimal(0)
+        for _ in range(rnd.choices([1, 2, 3, 4], weights=[40, 30, 20, 10])[0]):
+            code, description, price = rnd.choice(SERVICES)
+            quantity = rnd.choices([1, 2, 3], weights=[85, 10, 5])[0]
+            unit_price = Decimal(price) + Decimal(rnd.randint(0, 99)) / 100
+            buffers[BillingItem].append({'billing_record_id': record_id, 'service_code': code, 'service_description': description,
+                                         'quantity': quantity, 'unit_price': unit_price, 'total_price': unit_price * quantity})
+            total += unit_price * quantity
+        paid = total if rnd.random() < 0.5 else (Decimal(0) if rnd.random() < 0.6 else (total / 2).quantize(Decimal('0.01')))
+        if paid == total:
+            status = 'paid'
+        elif paid:
+            status = 'partial'
+        else:
+            status = 'overdue' if invoice_day < gen.today - timedelta(days=30) else 'pending'
+        records = patient_records.get(index)
+        buffers[BillingRecord].append({
+            'id': record_id, 'patient_id': patient_ids[index],
+            'medical_record_id': rnd.choice(records) if records and rnd.random() < 0.7 else None,
+            'invoice_number': f'INV-{record_id:09d}', 'invoice_date': invoice_day,
+            'due_date': invoice_day + timedelta(days=30), 'total_amount': total, 'paid_amount': paid,
+            'balance': total - paid, 'status': status,
+            'payment_method': rnd.choice(['cash', 'card', 'transfer']) if paid else None,
+            'payment_date': invoice_day + timedelta(days=rnd.randint(0, 30)) if paid else None, 'notes': None
+        })
+
+        if position < claim_count:
+            _claim_rows(gen, buffers, record_id, invoice_day, total, patient_policies[index],
+                        hmo_denial_factor, billing_user_ids)
+        if len(buffers[BillingRecord]) == SEED_CHUNK_SIZE:
+            flush()
+    flush()
+    for _, name in tables:
+        progress(f'{name}: {counts[name]} rows')
+
+    rebuild_rollups()
+    progress('Rollup tables rebuilt')
+    return counts
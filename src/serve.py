@@ -0,0 +1,76 @@
+import os
+import sys
+# Same path setup as main.py, so this runs as `python serve.py` from src or `python -m src.serve`
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import click
+from gunicorn.app.base import BaseApplication
+from src.main import create_app
+from src.models import db
+from src.jobs import resume_queued_jobs
+
+
+class PreforkServer(BaseApplication):
+    """
+    Gunicorn serving an application that was created once in the master process.
+
+    Workers are forked from the master, so they share its imported modules and
+    configured app instead of each importing and building it again.
+    """
+
+    def __init__(self, app, options):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def _post_fork(app):
+    def post_fork(server, worker):
+        with app.app_context():
+            # Connections pooled before the fork belong to the master; drop them without closing
+            db.engine.dispose(close=False)
+
+        # Every worker offers the queued jobs to its pools; only one claims each job
+        resume_queued_jobs(app)
+    return post_fork
+
+
+@click.command()
+@click.option('--bind', default=lambda: os.getenv('WEB_BIND', '0.0.0.0:5000'), show_default='0.0.0.0:5000 or $WEB_BIND',
+              help='Address to listen on')
+@click.option('--workers', type=click.IntRange(min=1), default=lambda: int(os.getenv('WEB_WORKERS', os.cpu_count() or 1)),
+              show_default='CPU count or $WEB_WORKERS', help='Worker processes forked after the app is loaded')
+@click.option('--threads', type=click.IntRange(min=1), default=lambda: int(os.getenv('WEB_THREADS', '4')),
+              show_default='4 or $WEB_THREADS', help='Request threads per worker')
+@click.option('--timeout', type=click.IntRange(min=0), default=lambda: int(os.getenv('WEB_TIMEOUT', '120')),
+              show_default='120 or $WEB_TIMEOUT', help='Seconds a request may run before its worker is restarted')
+def serve(bind, workers, threads, timeout):
+    """
+    Run the application in production: load it once, then pre-fork WORKERS processes
+    that each serve requests on THREADS threads.
+    """
+    app = create_app({'WEB_THREADS': threads})
+    # Memory cache entries are only invalidated by writes of their own worker
+    if workers > 1 and app.config.get('REPORT_CACHE_BACKEND') == 'memory':
+        raise click.UsageError('REPORT_CACHE_BACKEND=memory would serve stale reports with more than one worker; '
+                               'use sqlite or disable the cache')
+    PreforkServer(app, {
+        'bind': bind,
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread',
+        'timeout': timeout,
+        'preload_app': True,
+        'post_fork': _post_fork(app)
+    }).run()
+
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,233 @@
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from flask import request, jsonify
+from sqlalchemy import select
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError
+from src.models import db
+
+logger = logging.getLogger(__name__)
+
+# Items validated and inserted per transaction by the bulk endpoints
+BULK_CHUNK_SIZE = 1000
+MAX_BULK_CHUNK_SIZE = 10000
+# Largest number of items accepted in one bulk request
+MAX_BULK_ITEMS = 50000
+
+
+class BulkItemError(ValueError):
+    """
+    Raised while validating a single bulk item; the message is reported for that item
+    """
+
+
+def get_bulk_request(items_key):
+    """
+    Read the items list and the bulk options from the request body.
+    Returns (items, atomic, chunk_size) or raises BulkItemError for a malformed request.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get(items_key)
+    if not isinstance(items, list) or not items:
+        raise BulkItemError(f'{items_key} must be a non-empty list')
+    if len(items) > MAX_BULK_ITEMS:
+        raise BulkItemError(f'At most {MAX_BULK_ITEMS} {items_key} can be submitted per request')
+
+    try:
+        chunk_size = int(data.get('chunk_size', BULK_CHUNK_SIZE))
+    except (TypeError, ValueError):
+        raise BulkItemError('chunk_size must be an integer')
+    if chunk_size < 1:
+        raise BulkItemError('chunk_size must be a positive integer')
+
+    return items, bool(data.get('atomic', False)), min(chunk_size, MAX_BULK_CHUNK_SIZE)
+
+
+def chunked(items, size):
+    """
+    Yield (offset, chunk) pairs of at most size items
+    """
+    for offset in range(0, len(items), size):
+        yield offset, items[offset:offset + size]
+
+
+def require_fields(item, fields):
+    """
+    Check that a bulk item is an object holding every required field
+    """
+    if not isinstance(item, dict):
+        raise BulkItemError('Item must be an object')
+    for field in fields:
+        if item.get(field) is None:
+            raise BulkItemError(f'Missing required field: {field}')
+
+
+def parse_date(item, field, required=True):
+    """
+    Parse a YYYY-MM-DD field of a bulk item
+    """
+    value = item.get(field)
+    if value is None and not required:
+        return None
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        raise BulkItemError(f'Invalid date format for {field}. Use YYYY-MM-DD')
+
+
+def check_amount(amount, column, field):
+    """
+    Round an amount to the scale of its Numeric column and check that it fits the column's precision
+    """
+    precision, scale = column.type.precision, column.type.scale
+    amount = amount.quantize(Decimal(1).scaleb(-scale), ROUND_HALF_UP)
+    if abs(amount) >= Decimal(10) ** (precision - scale):
+        limit = Decimal(10) ** (precision - scale) - Decimal(1).scaleb(-scale)
+        raise BulkItemError(f'{field} must be between -{limit} and {limit}')
+    return amount
+
+
+def parse_amount(item, field, column, required=True):
+    """
+    Parse a monetary field of a bulk item as a Decimal that fits its Numeric column
+    """
+    value = item.get(field)
+    if value is None and not required:
+        return None
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise BulkItemError(f'{field} must be a number')
+    if not amount.is_finite():
+        raise BulkItemError(f'{field} must be a number')
+    return check_amount(amount, column, field)
+
+
+def parse_string(item, field, column, required=True):
+    """
+    Read a text field of a bulk item, checking it against the length of its String column
+    """
+    value = item.get(field)
+    if value is None and not required:
+        return None
+    value = str(value)
+    length = getattr(column.type, 'length', None)
+    if length is not None and len(value) > length:
+        raise BulkItemError(f'{field} must be at most {length} characters')
+    return value
+
+
+def parse_int(item, field):
+    """
+    Parse an integer id field of a bulk item
+    """
+    value = item.get(field)
+    if isinstance(value, bool):
+        raise BulkItemError(f'{field} must be an integer')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise BulkItemError(f'{field} must be an integer')
+
+
+def existing_values(column, values):
+    """
+    The subset of values present in column, looked up with one IN query per chunk
+    """
+    values = list(set(v for v in values if v is not None))
+    found = set()
+    for _, chunk in chunked(values, BULK_CHUNK_SIZE):
+        found.update(db.session.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def bulk_results(results):
+    """
+    Summary counts for a list of per-item results
+    """
+    return {
+        'created_count': sum(1 for result in results if result['status'] == 'created'),
+        'error_count': sum(1 for result in results if result['status'] == 'error'),
+        'results': results
+    }
+
+
+def process_bulk(items, atomic, chunk_size, parse_item, validate_chunk, insert_chunk, unique_fields, noun):
+    """
+    Run a bulk create request and build its response.
+
+    parse_item turns one item into a row or raises BulkItemError. validate_chunk and insert_chunk
+    receive a dict of item index to row plus the results list: validate_chunk removes failing rows
+    and records their errors, insert_chunk writes the rows and records their created results.
+    Rows repeating a value of any of unique_fields within the request are rejected. Without atomic every chunk is
+    committed on its own; with atomic nothing is written unless every item is valid. A database error rolls
+    back the chunk (or, with atomic, everything) and is reported in the affected items' results.
+    """
+    results = [None] * len(items)
+    rows = {}
+    seen = {field: set() for field in unique_fields}
+    for index, item in enumerate(items):
+        try:
+            row = parse_item(item)
+        except BulkItemError as e:
+            results[index] = {'index': index, 'status': 'error', 'error': str(e)}
+            continue
+        duplicate = next((field for field in unique_fields if row[field] in seen[field]), None)
+        if duplicate:
+            results[index] = {'index': index, 'status': 'error',
+                              'error': f"Duplicate {duplicate.replace('_', ' ')} in request"}
+            continue
+        for field in unique_fields:
+            seen[field].add(row[field])
+        rows[index] = row
+    
+    indexes = list(rows)
+    chunks = [{index: rows[index] for index in chunk} for _, chunk in chunked(indexes, chunk_size)]
+    
+    if atomic:
+        for chunk in chunks:
+            validate_chunk(chunk, results)
+        if any(result is not None for result in results):
+            for index in indexes:
+                if results[index] is None:
+                    results[index] = {'index': index, 'status': 'skipped'}
+            return jsonify({'error': f'No {noun} were created because some items are invalid',
+                            **bulk_results(results)}), 400
+        try:
+            for chunk in chunks:
+                insert_chunk(chunk, results)
+            db.session.commit()
+        except DBAPIError as e:
+            db.session.rollback()
+            for index in indexes:
+                results[index] = {'index': index, 'status': 'skipped'}
+            if isinstance(e, IntegrityError):
+                return jsonify({'error': f'No {noun} were created because of a conflicting concurrent write',
+                                **bulk_results(results)}), 409
+            if isinstance(e, DataError):
+                return jsonify({'error': f'No {noun} were created because the database rejected a value',
+                                **bulk_results(results)}), 400
+            logger.exception('Atomic bulk creation of %s failed', noun)
+            return jsonify({'error': f'No {noun} were created because of a database error',
+                            **bulk_results(results)}), 500
+        return jsonify({'message': f'{noun.capitalize()} created successfully', **bulk_results(results)}), 201
+    
+    # Earlier chunks stay committed when a later one fails, so every item still gets its result
+    for chunk in chunks:
+        try:
+            validate_chunk(chunk, results)
+            insert_chunk(chunk, results)
+            db.session.commit()
+        except DBAPIError as e:
+            db.session.rollback()
+            if isinstance(e, IntegrityError):
+                error = 'Conflicting concurrent write, item not created'
+            elif isinstance(e, DataError):
+                error = 'The database rejected a value in this chunk, item not created'
+            else:
+                logger.exception('Bulk creation of a chunk of %s failed', noun)
+                error = 'Database error, item not created'
+            for index in chunk:
+                results[index] = {'index': index, 'status': 'error', 'error': error}
+    
+    return jsonify({'message': f'Bulk {noun} submission processed', **bulk_results(results)}), 200
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Connections opened beyond the pool size when every pooled connection is in use
+DEFAULT_MAX_OVERFLOW = 10
+# Seconds a request waits for a connection before failing
+DEFAULT_POOL_TIMEOUT = 30
+# Seconds after which a connection is replaced, well below MySQL's default 8 hour wait_timeout
+DEFAULT_POOL_RECYCLE = 3600
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    A QueuePool that also records how long each checkout waited for a connection
+    (including opening a new one and the pre-ping) and how many checkouts timed out
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+
+def _config_value(config, key, default, convert=int):
+    value = config.get(key)
+    if value is None or value == '':
+        return default
+    return convert(value)
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() not in ('0', 'false', 'no', 'off', '')
+    return bool(value)
+
+
+def engine_options(config):
+    """
+    SQLAlchemy engine options for the connection pool configured on the app.
+
+    DB_POOL_SIZE defaults to one connection per request thread (WEB_THREADS) plus one per
+    background job thread (JOB_CONCURRENCY), so a busy worker never queues for a connection.
+    DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE and DB_POOL_PRE_PING override the
+    other settings. In-memory SQLite databases keep their single shared connection.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+
+    threads = _config_value(config, 'WEB_THREADS', 1)
+    job_threads = sum(config.get('JOB_CONCURRENCY', {}).values())
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': _config_value(config, 'DB_POOL_SIZE', threads + job_threads),
+        'max_overflow': _config_value(config, 'DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW),
+        # Whole seconds: Flask-SQLAlchemy's engine_from_config coerces pool_timeout to int
+        'pool_timeout': _config_value(config, 'DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+        'pool_recycle': _config_value(config, 'DB_POOL_RECYCLE', DEFAULT_POOL_RECYCLE),
+        'pool_pre_ping': _config_value(config, 'DB_POOL_PRE_PING', True, _flag)
+    }
+
+
+def pool_stats(engine):
+    """
+    Live statistics of the engine's connection pool in this process
+    """
+    pool = engine.pool
+    stats = {'pid': os.getpid(), 'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+            'recycle': pool._recycle,
+            'pre_ping': pool._pre_ping,
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            # overflow() counts up from -size as connections are first opened
+            'overflow': max(0, pool.overflow())
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            checkouts, timeouts, total_wait, max_wait = pool.checkouts, pool.timeouts, pool.total_wait, pool.max_wait
+        stats.update({
+            'checkouts': checkouts,
+            'timeouts': timeouts,
+            'wait_ms': {
+                'total': round(total_wait * 1000, 3),
+                'average': round(total_wait * 1000 / checkouts, 3) if checkouts else 0,
+                'max': round(max_wait * 1000, 3)
+            }
+        })
+    return stats
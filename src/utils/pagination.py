@@ -0,0 +1,150 @@
+import base64
+import json
+from datetime import date, datetime
+from flask import request
+from sqlalchemy import and_, or_
+
+# Page size used when the client does not pass ?limit=
+DEFAULT_PAGE_SIZE = 100
+
+# Hard upper bound on ?limit=, regardless of what the client asks for
+MAX_PAGE_SIZE = 1000
+
+
+class PaginationError(ValueError):
+    """
+    Raised when the limit or cursor query parameters are malformed
+    """
+
+
+def encode_cursor(values):
+    """
+    Encode the sort key values of the last row of a page into an opaque cursor
+    """
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decode an opaque cursor back into sort key values typed like the given columns
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+    if not isinstance(payload, list) or len(payload) != len(columns):
+        raise PaginationError('Invalid cursor')
+
+    values = []
+    for column, value in zip(columns, payload):
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = None
+
+        try:
+            if value is None:
+                values.append(None)
+            elif python_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            elif python_type is date:
+                values.append(date.fromisoformat(value))
+            elif python_type is int:
+                values.append(int(value))
+            else:
+                values.append(value)
+        except (ValueError, TypeError):
+            raise PaginationError('Invalid cursor')
+
+    return values
+
+
+def get_page_size():
+    """
+    Read ?limit= from the current request, clamped to MAX_PAGE_SIZE
+    """
+    limit = request.args.get('limit')
+    if limit is None or limit == '':
+        return DEFAULT_PAGE_SIZE
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+
+    if limit < 1:
+        raise PaginationError('limit must be a positive integer')
+
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_predicate(columns, values):
+    """
+    Build (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ... for a lexicographic keyset seek
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        equals = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equals, column > values[i]))
+    return or_(*clauses)
+
+
+def _with_sort_columns(query, columns):
+    """
+    Add sort columns missing from a column projection (e.g. a sparse fieldset) so every
+    row still carries its cursor position; entity queries already load every column
+    """
+    descriptions = query.column_descriptions
+    if any(description['expr'] is description['entity'] for description in descriptions):
+        return query
+    selected = [description['expr'] for description in descriptions]
+    missing = [column for column in columns if not any(column is expr for expr in selected)]
+    return query.add_columns(*missing) if missing else query
+
+
+def keyset_query(query, *columns):
+    """
+    Apply the ?after= seek, sort order and a limit of one extra row to a query.
+
+    Returns the query and the page size; callers that iterate the query
+    themselves (e.g. to stream it) use the extra row to detect a next page.
+    """
+    limit = get_page_size()
+    query = _with_sort_columns(query, columns)
+
+    after = request.args.get('after')
+    if after:
+        query = query.filter(keyset_predicate(columns, decode_cursor(after, columns)))
+
+    return query.order_by(*columns).limit(limit + 1), limit
+
+
+def cursor_for(row, columns):
+    """
+    Build the cursor that resumes after the given row
+    """
+    return encode_cursor([getattr(row, column.key) for column in columns])
+
+
+def paginate(query, *columns):
+    """
+    Apply keyset pagination to a query using ?limit= and ?after= from the request.
+
+    `columns` is the sort key, most significant first; the last column must be
+    unique (normally the primary key) so every row has a distinct position.
+    Returns the rows of the page and the cursor for the next page, or None
+    when this is the last page.
+    """
+    query, limit = keyset_query(query, *columns)
+    rows = query.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = cursor_for(rows[-1], columns)
+
+    return rows, next_cursor
@@ -0,0 +1,53 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash
+
+# Below this many passwords the hashes are computed in the calling thread
+MIN_POOLED_PASSWORDS = 4
+# Processes hashing passwords at once
+HASH_WORKERS = os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_pid = None
+
+
+def _hash_pool():
+    """
+    The process pool used for password hashing in this process, created on first use
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        # Pools do not survive a fork; start fresh in each worker process
+        if _pool_pid != os.getpid():
+            _pool = None
+            _pool_pid = os.getpid()
+
+        if _pool is None:
+            # Never fork: this runs on a request thread while job threads are live, and the pool
+            # starts its processes on demand. Forking a threaded process can deadlock the child on
+            # a lock another thread held, so start them from a single-threaded fork server
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(['werkzeug.security'])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=context)
+        return _pool
+
+
+def hash_passwords(passwords):
+    """
+    Hash a list of passwords with werkzeug's generate_password_hash, spread across CPU cores.
+
+    The hashes are deliberately slow, so a batch is handed to a process pool instead of
+    being computed one after another on the request thread. Returns hashes in input order.
+    """
+    passwords = list(passwords)
+    if len(passwords) < MIN_POOLED_PASSWORDS:
+        return [generate_password_hash(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (HASH_WORKERS * 4))
+    return list(_hash_pool().map(generate_password_hash, passwords, chunksize=chunksize))
@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+import flask
+import flask_sqlalchemy
+import sqlalchemy
+import werkzeug
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Times one statement shape may run in a request before the guard reports it (debug and testing mode)
+DEFAULT_QUERY_REPEAT_LIMIT = 10
+
+# Lists of bound parameters, which vary in length with the values passed to IN
+_PARAMETER_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))+\s*\)')
+# Frames skipped when looking for the code that ran a statement
+_LIBRARY_DIRS = tuple(os.path.dirname(module.__file__) + os.sep for module in (flask, flask_sqlalchemy, sqlalchemy, werkzeug))
+_UTILS_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_PROJECT_DIR = os.path.dirname(os.path.dirname(_UTILS_DIR.rstrip(os.sep))) + os.sep
+
+
+class QueryBudgetError(Exception):
+    """
+    Raised by the query guard, when QUERY_GUARD_ACTION is 'raise', at the statement that
+    exceeded its endpoint's query budget or repeated a statement too often
+    """
+
+
+class QueryStats:
+    """
+    SQL statements executed while handling one request, their total time and the
+    rows the driver reported for them
+    """
+
+    __slots__ = ('queries', 'seconds', 'rows', 'started', 'request_started', 'status',
+                 'shapes', 'repeat_limit', 'budget', 'action', 'violations')
+
+    def __init__(self, repeat_limit=0, budget=None, action='warn'):
+        self.queries = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.started = None
+        self.request_started = time.perf_counter()
+        self.status = None
+        # Query guard: executions per statement shape, only counted when the guard is on
+        self.shapes = {} if repeat_limit or budget is not None else None
+        self.repeat_limit = repeat_limit
+        self.budget = budget
+        self.action = action
+        self.violations = []
+
+    def check(self, statement):
+        """
+        Count the statement's shape and report it the first time it runs more than
+        repeat_limit times, or when the request first exceeds its query budget
+        """
+        shape = _PARAMETER_LIST.sub('(?)', statement)
+        count = self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        if self.repeat_limit and count == self.repeat_limit + 1:
+            self._violation(shape, f'Statement ran more than {self.repeat_limit} times', shape)
+        if self.budget is not None and self.queries == self.budget + 1:
+            self._violation(None, f'Query budget of {self.budget} exceeded', shape)
+
+    def _violation(self, shape, message, statement):
+        site = _call_site()
+        if self.action == 'raise':
+            raise QueryBudgetError(f'{message} at {site}: {statement}')
+        self.violations.append((shape, message, site, statement))
+
+    @property
+    def time_ms(self):
+        return round(self.seconds * 1000, 3)
+
+
+def _call_site():
+    """
+    The innermost frame outside the web and database libraries, preferring one
+    outside src/utils, as "path:line in function"
+    """
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        # <string> frames are functions SQLAlchemy generates at runtime
+        if not filename.startswith(_LIBRARY_DIRS + ('<',)) and filename != __file__:
+            path = filename[len(_PROJECT_DIR):] if filename.startswith(_PROJECT_DIR) else filename
+            site = f'{path}:{frame.f_lineno} in {frame.f_code.co_name}'
+            if not filename.startswith(_UTILS_DIR):
+                return site
+            fallback = fallback or site
+        frame = frame.f_back
+    return fallback or 'unknown'
+
+
+def query_budget(max_queries):
+    """
+    Declare the most SQL statements a view may run per request; the query guard
+    reports requests that exceed it in debug and testing mode
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def _guard_settings(app):
+    """
+    (repeat limit, action) of the query guard: QUERY_REPEAT_LIMIT, defaulting to
+    DEFAULT_QUERY_REPEAT_LIMIT in debug and testing mode and 0 (off) otherwise, and
+    QUERY_GUARD_ACTION, 'warn' or 'raise' (the default when testing)
+    """
+    limit = app.config.get('QUERY_REPEAT_LIMIT')
+    if limit is None or limit == '':
+        limit = DEFAULT_QUERY_REPEAT_LIMIT if app.debug or app.testing else 0
+    action = app.config.get('QUERY_GUARD_ACTION') or ('raise' if app.testing else 'warn')
+    if action not in ('warn', 'raise'):
+        raise ValueError(f'Unknown QUERY_GUARD_ACTION: {action}')
+    return int(limit), action
+
+
+def _current_stats():
+    return g.get('query_stats') if has_request_context() else None
+
+
+# Count and time every statement sent to any engine while a request is being handled.
+# A request runs its statements one at a time on its own thread, so one start time suffices.
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    if stats is not None:
+        stats.started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    if stats is not None and stats.started is not None:
+        stats.seconds += time.perf_counter() - stats.started
+        stats.started = None
+        stats.queries += 1
+        if stats.shapes is not None:
+            stats.check(statement)
+        # Rows changed by DML; MySQL drivers also report the rows a SELECT returned, SQLite does not
+        if cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+
+
+def init_query_stats(app):
+    """
+    Add X-DB-Queries and X-DB-Time-Ms headers to every response and log one JSON line
+    per request with its endpoint, status, duration and SQL statistics.
+
+    In debug and testing mode the query guard also counts each statement shape (the SQL
+    text, with IN lists collapsed) and reports one that runs more than QUERY_REPEAT_LIMIT
+    times in a request, the sign of a query per row, and views exceeding the budget set
+    with @query_budget. It logs a warning naming the call site, or raises QueryBudgetError
+    from that statement when QUERY_GUARD_ACTION is 'raise' (the default under app.testing).
+
+    QUERY_STATS turns all of this off when false. The log goes to the `src.utils.query_stats`
+    logger at INFO; a handler printing to stderr is added if logging is not configured.
+    Streamed responses carry the statistics up to the start of the stream in their headers,
+    while the log line covers the whole response.
+    """
+    if not app.config.get('QUERY_STATS', True):
+        return
+
+    if not logger.handlers and not logging.getLogger().handlers:
+        logger.addHandler(logging.StreamHandler())
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+
+    @app.before_request
+    def start_query_stats():
+        repeat_limit, action = _guard_settings(current_app)
+        budget = None
+        # A repeat limit of 0 turns the whole guard off
+        if repeat_limit:
+            view = current_app.view_functions.get(request.endpoint)
+            budget = getattr(view, 'query_budget', None)
+        g.query_stats = QueryStats(repeat_limit, budget, action)
+
+    @app.after_request
+    def add_query_stats_headers(response):
+        stats = g.get('query_stats')
+        if stats is not None:
+            stats.status = response.status_code
+            response.headers['X-DB-Queries'] = str(stats.queries)
+            response.headers['X-DB-Time-Ms'] = f'{stats.time_ms:.3f}'
+        return response
+
+    @app.teardown_request
+    def log_query_stats(error=None):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return
+        for shape, message, site, statement in stats.violations:
+            # Final counts, as the request may have run the statement many more times
+            if shape is None:
+                total = f'{stats.queries} statements in all'
+            else:
+                total = f'{stats.shapes[shape]} times in all'
+            logger.warning('%s in %s (%s) at %s: %s', message, request.endpoint, total, site, statement)
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'blueprint': request.blueprint,
+            'endpoint': request.endpoint,
+            # The status sent; streamed responses can still fail after it
+            'status': stats.status or 500,
+            'duration_ms': round((time.perf_counter() - stats.request_started) * 1000, 3),
+            'db_queries': stats.queries,
+            'db_time_ms': stats.time_ms,
+            'db_rows': stats.rows
+        }, separators=(',', ':')))
@@ -0,0 +1,210 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from flask import Response, current_app, has_app_context, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Default number of cached report responses kept before least-recently-used eviction
+DEFAULT_MAX_ENTRIES = 256
+# Seconds a hit on the shared cache may go unrecorded, so most reads do not write (approximate LRU)
+ACCESS_REFRESH_SECONDS = 60
+
+
+class MemoryCacheBackend:
+    """
+    Per-process LRU cache; version counters are local to the process, so only
+    writes made by this worker invalidate its entries. Only safe with a single
+    worker process, which serve.py enforces.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_versions(self, tables):
+        with self._lock:
+            return [self._versions.get(table, 0) for table in tables]
+
+    def bump_versions(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+
+class SQLiteCacheBackend:
+    """
+    LRU cache and version counters in a local SQLite file, shared by every
+    worker process on the host. An entry's access time is only rewritten when
+    it is ACCESS_REFRESH_SECONDS old, so hits rarely take the file's write lock.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed)')
+            conn.execute('CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute('SELECT value, accessed FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] >= ACCESS_REFRESH_SECONDS:
+            conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return row[0]
+
+    def set(self, key, value):
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO entries (key, value, accessed) VALUES (?, ?, ?)', (key, value, time.time()))
+        conn.execute(
+            'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def get_versions(self, tables):
+        rows = dict(self._connect().execute(
+            'SELECT name, version FROM versions WHERE name IN (%s)' % ','.join('?' * len(tables)), list(tables)
+        ).fetchall())
+        return [rows.get(table, 0) for table in tables]
+
+    def bump_versions(self, tables):
+        conn = self._connect()
+        for table in tables:
+            conn.execute(
+                'INSERT INTO versions (name, version) VALUES (?, 1) '
+                'ON CONFLICT(name) DO UPDATE SET version = version + 1',
+                (table,)
+            )
+
+
+def _written_tables(session):
+    return session.info.setdefault('report_cache_written_tables', set())
+
+
+# Record every table touched by a flush or DML statement, and bump their versions once the commit succeeds
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    tables = _written_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tables.add(obj.__table__.name)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _written_tables(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_on_commit(session):
+    tables = session.info.pop('report_cache_written_tables', None)
+    if tables and has_app_context():
+        backend = current_app.extensions.get('report_cache')
+        if backend is not None:
+            backend.bump_versions(sorted(tables))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('report_cache_written_tables', None)
+
+
+def init_report_cache(app):
+    """
+    Create the report cache backend configured on the app.
+
+    REPORT_CACHE_BACKEND is 'memory', 'sqlite' or empty to disable caching;
+    REPORT_CACHE_PATH is the SQLite file of the shared backend and
+    REPORT_CACHE_MAX_ENTRIES bounds either backend.
+    """
+    backend_name = app.config.get('REPORT_CACHE_BACKEND')
+    if not backend_name:
+        return None
+
+    max_entries = int(app.config.get('REPORT_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+    if backend_name == 'memory':
+        backend = MemoryCacheBackend(max_entries)
+    elif backend_name == 'sqlite':
+        backend = SQLiteCacheBackend(app.config.get('REPORT_CACHE_PATH', 'report_cache.sqlite3'), max_entries)
+    else:
+        raise ValueError(f'Unknown REPORT_CACHE_BACKEND: {backend_name}')
+
+    app.extensions['report_cache'] = backend
+    return backend
+
+
+def cached_report(*tables):
+    """
+    Cache a report handler's JSON response, keyed on the endpoint, its normalized
+    query parameters, today's date (reports default to ranges ending today) and
+    the write versions of `tables`, the tables the report reads
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            backend = current_app.extensions.get('report_cache')
+            if backend is None:
+                return view(*args, **kwargs)
+
+            params = sorted((name, value) for name, value in request.args.items(multi=True) if value != '')
+            key = json.dumps([
+                request.endpoint,
+                params,
+                datetime.utcnow().date().isoformat(),
+                backend.get_versions(tables)
+            ], separators=(',', ':'))
+
+            cached = backend.get(key)
+            if cached is not None:
+                response = Response(cached, status=200, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                backend.set(key, response.get_data())
+            response.headers['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+    return decorator
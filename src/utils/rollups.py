@@ -0,0 +1,152 @@
+from sqlalchemy import Integer, cast, delete, func, insert, select, true, update
+from sqlalchemy.exc import IntegrityError
+from src.models import db
+from src.models.billing import BillingRecord
+from src.models.claim import Claim
+from src.models.rollup import BillingDailyRollup, ClaimDailyRollup, ClaimProcessingDailyRollup
+from src.utils.sql import days_between
+
+# Claim and billing record columns the rollups are computed from, in the order of a state row
+CLAIM_STATE_COLUMNS = [Claim.submission_date, Claim.hmo_id, Claim.status, Claim.total_amount,
+                       Claim.approved_amount, Claim.payment_amount, Claim.payment_date]
+BILLING_STATE_COLUMNS = [BillingRecord.invoice_date, BillingRecord.status, BillingRecord.total_amount,
+                         BillingRecord.paid_amount, BillingRecord.balance]
+
+
+def claim_rollup_states(*criteria):
+    """
+    The CLAIM_STATE_COLUMNS of the claims matching criteria, as stored in the database.
+    Read them before and after changing claims (after a flush) for update_claim_rollups.
+    """
+    return db.session.execute(select(*CLAIM_STATE_COLUMNS).where(*criteria)).all()
+
+
+def billing_rollup_states(*criteria):
+    """
+    The BILLING_STATE_COLUMNS of the billing records matching criteria, as stored in the database
+    """
+    return db.session.execute(select(*BILLING_STATE_COLUMNS).where(*criteria)).all()
+
+
+def _add(deltas, key, sign, **amounts):
+    totals = deltas.setdefault(key, dict.fromkeys(amounts, 0))
+    for name, amount in amounts.items():
+        totals[name] += sign * (amount or 0)
+
+
+def _apply_deltas(model, key_names, count_name, deltas):
+    """
+    Add deltas, {key: {column: amount}}, to the rollup rows of model with one UPDATE per key,
+    inserting rows that do not exist yet and removing rows whose count drops to zero.
+
+    Only the affected rollup rows are locked, always in the same (sorted) order, so concurrent
+    writers to the same group wait for each other instead of deadlocking.
+    """
+    for key, amounts in sorted(deltas.items(), key=lambda item: repr(item[0])):
+        if not any(amounts.values()):
+            continue
+        match = [getattr(model, name).is_(None) if value is None else getattr(model, name) == value
+                 for name, value in zip(key_names, key)]
+        changes = {name: getattr(model, name) + amount for name, amount in amounts.items()}
+
+        if db.session.execute(update(model).where(*match).values(**changes)).rowcount:
+            if amounts[count_name] < 0:
+                db.session.execute(delete(model).where(*match, getattr(model, count_name) <= 0))
+            continue
+        # A missing row can only gain rows; anything else means the rollups are out of
+        # sync with the raw rows, which rebuild-rollups repairs
+        if amounts[count_name] <= 0:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(model).values(**dict(zip(key_names, key)), **amounts))
+        except IntegrityError:
+            # Inserted by a concurrent writer since the UPDATE
+            db.session.execute(update(model).where(*match).values(**changes))
+
+
+def update_claim_rollups(removed, added):
+    """
+    Update the claim rollups incrementally for changed claims: subtract what the `removed`
+    claim states contributed and add what the `added` ones contribute. States are rows from
+    claim_rollup_states; pass the states from before a change as removed and those from
+    after it (once flushed) as added. Call before commit, in the transaction of the change.
+    """
+    daily = {}
+    processing = {}
+    for sign, states in ((-1, removed), (1, added)):
+        for day, hmo_id, status, total_amount, approved_amount, payment_amount, payment_date in states:
+            _add(daily, (day, hmo_id, status), sign, claim_count=1, billed_amount=total_amount,
+                 approved_amount=approved_amount, paid_amount=payment_amount)
+            if payment_date is not None:
+                _add(processing, (day, hmo_id, (payment_date - day).days), sign, claim_count=1)
+
+    _apply_deltas(ClaimDailyRollup, ['day', 'hmo_id', 'status'], 'claim_count', daily)
+    _apply_deltas(ClaimProcessingDailyRollup, ['day', 'hmo_id', 'processing_days'], 'claim_count', processing)
+
+
+def update_billing_rollups(removed, added):
+    """
+    Update the billing rollups incrementally for changed billing records, like
+    update_claim_rollups, with states from billing_rollup_states
+    """
+    daily = {}
+    for sign, states in ((-1, removed), (1, added)):
+        for day, status, total_amount, paid_amount, balance in states:
+            _add(daily, (day, status), sign, record_count=1, total_amount=total_amount,
+                 paid_amount=paid_amount, balance=balance)
+
+    _apply_deltas(BillingDailyRollup, ['day', 'status'], 'record_count', daily)
+
+
+def _claim_rollup_select(claim_filter):
+    return select(
+        Claim.submission_date,
+        Claim.hmo_id,
+        Claim.status,
+        func.count(Claim.id),
+        func.coalesce(func.sum(Claim.total_amount), 0),
+        func.coalesce(func.sum(Claim.approved_amount), 0),
+        func.coalesce(func.sum(Claim.payment_amount), 0)
+    ).where(claim_filter).group_by(Claim.submission_date, Claim.hmo_id, Claim.status)
+
+
+def _claim_processing_rollup_select(claim_filter):
+    processing_days = cast(days_between(Claim.submission_date, Claim.payment_date), Integer)
+    return select(
+        Claim.submission_date,
+        Claim.hmo_id,
+        processing_days,
+        func.count(Claim.id)
+    ).where(claim_filter, Claim.payment_date.isnot(None)).group_by(Claim.submission_date, Claim.hmo_id, processing_days)
+
+
+def _billing_rollup_select(billing_filter):
+    return select(
+        BillingRecord.invoice_date,
+        BillingRecord.status,
+        func.count(BillingRecord.id),
+        func.coalesce(func.sum(BillingRecord.total_amount), 0),
+        func.coalesce(func.sum(BillingRecord.paid_amount), 0),
+        func.coalesce(func.sum(BillingRecord.balance), 0)
+    ).where(billing_filter).group_by(BillingRecord.invoice_date, BillingRecord.status)
+
+
+CLAIM_ROLLUP_COLUMNS = ['day', 'hmo_id', 'status', 'claim_count', 'billed_amount', 'approved_amount', 'paid_amount']
+CLAIM_PROCESSING_ROLLUP_COLUMNS = ['day', 'hmo_id', 'processing_days', 'claim_count']
+BILLING_ROLLUP_COLUMNS = ['day', 'status', 'record_count', 'total_amount', 'paid_amount', 'balance']
+
+
+def rebuild_rollups():
+    """
+    Recompute every rollup table from scratch
+    """
+    for model in (ClaimDailyRollup, ClaimProcessingDailyRollup, BillingDailyRollup):
+        db.session.execute(delete(model))
+
+    db.session.execute(insert(ClaimDailyRollup).from_select(CLAIM_ROLLUP_COLUMNS, _claim_rollup_select(true())))
+    db.session.execute(insert(ClaimProcessingDailyRollup).from_select(
+        CLAIM_PROCESSING_ROLLUP_COLUMNS, _claim_processing_rollup_select(true())
+    ))
+    db.session.execute(insert(BillingDailyRollup).from_select(BILLING_ROLLUP_COLUMNS, _billing_rollup_select(true())))
+    db.session.commit()
@@ -0,0 +1,203 @@
+import hashlib
+from flask import abort, current_app, has_request_context, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from src.models import db
+from src.utils.pagination import paginate
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_specs = {}
+
+
+class FieldsError(ValueError):
+    """
+    Raised for a ?fields= parameter naming fields the resource does not have
+    """
+
+
+class _SerializerSpec:
+    """
+    The columns behind a model's to_dict keys (or a subset of them) and how each value is converted
+    """
+
+    def __init__(self, model, fields=None):
+        columns = {column.key: column for column in model.__table__.columns}
+        # to_dict stays the source of truth for which fields a model exposes
+        keys = list(model().to_dict())
+        unknown = [key for key in keys if key not in columns]
+        if unknown:
+            raise ValueError(f"{model.__name__}.to_dict has fields that are not columns: {', '.join(unknown)}")
+        self.all_keys = keys
+        if fields is not None:
+            keys = [key for key in keys if key in fields]
+
+        self.keys = keys
+        self.columns = [getattr(model, key) for key in keys]
+        self.float_keys = []
+        self.iso_keys = []
+        # orjson and json.dumps print a float the same way unless it needs an exponent
+        self.plain_floats = True
+        for key in keys:
+            column_type = columns[key].type
+            if isinstance(column_type, db.Numeric) and not isinstance(column_type, db.Float):
+                self.float_keys.append(key)
+                precision, scale = column_type.precision, column_type.scale or 0
+                if precision is None or precision - scale > 15 or scale > 4:
+                    self.plain_floats = False
+            elif isinstance(column_type, (db.Date, db.DateTime)):
+                self.iso_keys.append(key)
+            elif isinstance(column_type, db.Float):
+                self.plain_floats = False
+
+
+def _spec(model, fields=None):
+    spec = _specs.get((model, fields))
+    if spec is None:
+        spec = _specs[(model, fields)] = _SerializerSpec(model, fields)
+    return spec
+
+
+def requested_fields(model):
+    """
+    The fields selected with ?fields=a,b as a tuple, or None when every field is wanted
+    """
+    value = request.args.get('fields', '') if has_request_context() else ''
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if not names:
+        return None
+
+    all_keys = _spec(model).all_keys
+    unknown = [name for name in names if name not in all_keys]
+    if unknown:
+        raise FieldsError(f"Unknown field(s): {', '.join(unknown)}. Available fields: {', '.join(all_keys)}")
+    return tuple(sorted(set(names)))
+
+
+def serialized_query(model):
+    """
+    A query selecting only the columns of model.to_dict, narrowed to ?fields= when given,
+    returning rows instead of ORM objects
+    """
+    return db.session.query(*_spec(model, requested_fields(model)).columns)
+
+
+def serialize_rows(model, rows):
+    """
+    Convert rows from serialized_query into the dicts model.to_dict would produce,
+    holding only the ?fields= selection when given
+    """
+    spec = _spec(model, requested_fields(model))
+    keys, float_keys, iso_keys = spec.keys, spec.float_keys, spec.iso_keys
+    result = []
+    for row in rows:
+        item = dict(zip(keys, row))
+        for key in float_keys:
+            value = item[key]
+            item[key] = float(value) if value else 0
+        for key in iso_keys:
+            value = item[key]
+            item[key] = value.isoformat() if value else None
+        result.append(item)
+    return result
+
+
+def _fast_json_enabled(app):
+    provider = app.json
+    return (
+        orjson is not None
+        and type(provider) is DefaultJSONProvider
+        and provider.sort_keys
+        and provider.ensure_ascii
+        and (provider.compact or (provider.compact is None and not app.debug))
+    )
+
+
+def json_response(payload, status=200, plain_floats=True):
+    """
+    Encode payload exactly as jsonify would, using orjson when it is installed.
+
+    orjson output is only used when it is byte-identical to the json module's: the app
+    must use Flask's default compact, sorted, ASCII-escaped encoding, every float in the
+    payload must print without an exponent (plain_floats), and the encoded body must be
+    ASCII without DEL, since json.dumps escapes everything else.
+    """
+    app = current_app
+    if plain_floats and _fast_json_enabled(app):
+        try:
+            body = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        except (TypeError, orjson.JSONEncodeError):
+            body = None
+        if body is not None and body.isascii() and b'\x7f' not in body:
+            return app.response_class(body + b'\n', status=status, mimetype=app.json.mimetype)
+    response = jsonify(payload)
+    response.status_code = status
+    return response
+
+
+def _etag(*parts):
+    """
+    A validator for the current URL (path and query string, so fields, limit and after
+    all count) given the parts that identify the state of the data behind it
+    """
+    raw = '|'.join(str(part) for part in (request.full_path, *parts))
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def _not_modified(etag):
+    """
+    An empty 304 response when the request's If-None-Match matches etag, otherwise None
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def list_response(key, model, rows, **extra):
+    """
+    A 200 response listing rows from serialized_query under key, with extra top-level fields
+    """
+    plain_floats = _spec(model, requested_fields(model)).plain_floats
+    return json_response({key: serialize_rows(model, rows), **extra}, 200, plain_floats)
+
+
+def paginated_response(key, model, query, *columns):
+    """
+    Paginate query (from serialized_query) by columns and respond with list_response, under
+    a weak ETag built from the rows of the page and its next cursor, so a page costs one
+    keyset query whether or not it changed. A matching If-None-Match gets a 304 without the
+    page being serialized.
+    """
+    rows, next_cursor = paginate(query, *columns)
+    etag = _etag(model.__tablename__, next_cursor, *rows)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = list_response(key, model, rows, next_cursor=next_cursor)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def entity_response(key, model, entity_id):
+    """
+    A 200 response with the single row of model whose primary key is entity_id under key, or 404.
+    The row is fetched alongside its updated_at and both make up a weak ETag; a matching
+    If-None-Match gets a 304 without the row being serialized.
+    """
+    row = serialized_query(model).add_columns(model.updated_at).filter(model.id == entity_id).first()
+    if row is None:
+        abort(404)
+    etag = _etag(model.__tablename__, row)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    plain_floats = _spec(model, requested_fields(model)).plain_floats
+    response = json_response({key: serialize_rows(model, [row])[0]}, 200, plain_floats)
+    response.set_etag(etag, weak=True)
+    return response
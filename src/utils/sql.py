@@ -0,0 +1,31 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Float
+
+
+class days_between(FunctionElement):
+    """
+    Number of days from the first date expression to the second, compiled per dialect:
+    DATEDIFF on MySQL, date subtraction on PostgreSQL and julianday() arithmetic elsewhere (SQLite)
+    """
+    type = Float()
+    inherit_cache = True
+    name = 'days_between'
+
+
+@compiles(days_between)
+def _days_between_default(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return 'julianday(%s) - julianday(%s)' % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+
+@compiles(days_between, 'mysql')
+def _days_between_mysql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return 'DATEDIFF(%s, %s)' % (compiler.process(end, **kw), compiler.process(start, **kw))
+
+
+@compiles(days_between, 'postgresql')
+def _days_between_postgresql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return '(%s - %s)' % (compiler.process(end, **kw), compiler.process(start, **kw))
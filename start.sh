@@ -4,4 +4,4 @@
 cd /home/ubuntu/emr_system/emr_app
 source venv/bin/activate
 cd src
-python main.py
+python serve.py
@@ -0,0 +1,83 @@
+"""
+Query budgets of the report endpoints, enforced by the query guard under app.testing
+"""
+import os
+import sys
+# Same path setup as src/main.py, so `pytest` works from the project root without installing anything
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import jsonify
+from src.main import create_app
+from src.models import db
+from src.models.claim import Claim
+from src.seed import seed_data
+from src.utils.query_stats import QueryBudgetError, query_budget
+
+# Synthetic data at this fraction of the seed-data volumes (about 1000 claims)
+SEED_SCALE = 0.001
+# Reports default to the last 30 days; reach back over every seeded day instead
+REPORT_ARGS = {'start_date': '2000-01-01'}
+
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'TESTING': True,
+        'REPORT_CACHE_BACKEND': '',
+        'QUERY_REPEAT_LIMIT': '',
+        'QUERY_GUARD_ACTION': 'raise'
+    })
+
+    @app.route('/test/query-per-row')
+    def query_per_row():
+        # One lazy load of the reconciliations per claim: the N+1 pattern the guard exists for
+        return jsonify([len(claim.reconciliations) for claim in Claim.query.limit(20)])
+
+    @app.route('/test/over-budget')
+    @query_budget(1)
+    def over_budget():
+        return jsonify({'claims': Claim.query.count(), 'first': Claim.query.first().id})
+
+    with app.app_context():
+        db.create_all()
+        seed_data(SEED_SCALE, progress=lambda message: None)
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+def _budgeted_endpoints():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'REPORT_CACHE_BACKEND': ''})
+    return sorted(
+        (rule.rule, app.view_functions[rule.endpoint].query_budget) for rule in app.url_map.iter_rules()
+        if hasattr(app.view_functions[rule.endpoint], 'query_budget')
+    )
+
+
+@pytest.mark.parametrize('path, budget', _budgeted_endpoints())
+def test_report_stays_within_its_query_budget(app, path, budget):
+    # The guard raises QueryBudgetError from the statement that exceeds the budget
+    response = app.test_client().get(path, query_string=REPORT_ARGS)
+    body = response.get_data()
+
+    assert response.status_code == 200, body
+    assert int(response.headers['X-DB-Queries']) <= budget
+
+
+def test_reports_have_budgets():
+    # An empty list would silently skip the budget test above
+    paths = [path for path, _ in _budgeted_endpoints()]
+    assert '/api/reports/reports/financial-summary' in paths
+    assert '/api/reports/reports/reconciliation-audit' in paths
+
+
+def test_query_per_row_raises(app):
+    with pytest.raises(QueryBudgetError, match='Statement ran more than 10 times'):
+        app.test_client().get('/test/query-per-row')
+
+
+def test_query_budget_exceeded_raises(app):
+    with pytest.raises(QueryBudgetError, match='Query budget of 1 exceeded'):
+        app.test_client().get('/test/over-budget')